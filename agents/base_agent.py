@@ -5,10 +5,18 @@ Abstract base class for all EnviroComply agents with shared capabilities.
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Deque, Tuple
+from datetime import date, datetime, timezone
 from uuid import uuid4
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
 import asyncio
+import hashlib
+import json
+import re
+import time
+import httpx
+import orjson
 from loguru import logger
 
 from langchain_openai import ChatOpenAI
@@ -20,6 +28,33 @@ from core.models import AgentDecision
 from core.exceptions import AgentError, LLMError
 
 
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# Distinct system prompt suffixes (e.g. output schemas) cached per agent
+_SYSTEM_MESSAGE_CACHE_SIZE = 64
+
+# Formatted context strings, keyed by a frozen copy of the context dict
+_CONTEXT_CACHE_SIZE = 256
+_context_cache: "OrderedDict[Any, str]" = OrderedDict()
+
+
+def _freeze(value: Any) -> Any:
+    """Convert a context value into a hashable key, raising TypeError if it can't."""
+    if isinstance(value, dict):
+        return (dict, tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(v) for v in value))
+    if value is None or isinstance(value, (str, int, float, datetime, date)):
+        return (type(value), value)
+    raise TypeError(f"Unfreezable context value: {type(value).__name__}")
+
+
+@lru_cache(maxsize=256)
+def _render_schema(schema_key: bytes) -> str:
+    """Pretty-print a compact schema once; agents reuse the same few schemas."""
+    return orjson.dumps(orjson.loads(schema_key), option=orjson.OPT_INDENT_2).decode()
+
+
 class BaseAgent(ABC):
     """
     Abstract base class for EnviroComply agents.
@@ -35,11 +70,25 @@ class BaseAgent(ABC):
         self,
         agent_id: str = None,
         memory_store = None,
+        llm = None,
     ):
         self.agent_id = agent_id or f"{self.agent_type}_{uuid4().hex[:8]}"
         self.memory_store = memory_store
-        self.llm = self._initialize_llm()
-        self.decision_history: List[AgentDecision] = []
+        self.llm = llm or self._initialize_llm()
+        self.decision_history: Deque[AgentDecision] = deque(maxlen=settings.agent.decision_history_size)
+        self._decision_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._llm_cache: OrderedDict[str, str] = OrderedDict()
+        self._health_cache: Optional[Tuple[float, bool]] = None
+        self._ping_http: Optional[httpx.AsyncClient] = None
+        
+        # Caps in-flight LLM requests when callers fan work out concurrently
+        self._llm_semaphore = asyncio.Semaphore(settings.llm.max_concurrent_requests or 8)
+        
+        # System prompts are static per agent, so reuse the message objects
+        self._system_messages: Dict[Optional[str], SystemMessage] = {
+            None: SystemMessage(content=self.system_prompt),
+        }
         
         logger.info(f"Initialized {self.agent_type} agent: {self.agent_id}")
     
@@ -60,8 +109,9 @@ class BaseAgent(ABC):
         """Return a description of the agent's purpose."""
         return f"{self.agent_type} agent"
     
-    def _initialize_llm(self) -> ChatOpenAI:
-        """Initialize the LLM client."""
+    @staticmethod
+    def _initialize_llm(http_async_client: httpx.AsyncClient = None) -> ChatOpenAI:
+        """Initialize the LLM client, optionally on a shared HTTP connection pool."""
         llm_settings = settings.llm
         
         if llm_settings.provider == "openai":
@@ -70,6 +120,7 @@ class BaseAgent(ABC):
                 temperature=llm_settings.openai_temperature,
                 max_tokens=llm_settings.max_tokens,
                 api_key=llm_settings.openai_api_key,
+                http_async_client=http_async_client,
             )
         else:
             # Fallback to Ollama
@@ -84,43 +135,102 @@ class BaseAgent(ABC):
         prompt: str,
         context: Dict[str, Any] = None,
         examples: List[Dict] = None,
+        system_suffix: str = None,
     ) -> str:
         """
         Generate a response from the LLM.
         
+        Static instructions belong in the system message so repeated calls
+        share a prompt prefix the provider can cache; per-call data goes last.
+        
         Args:
             prompt: The main prompt/question
             context: Additional context to include
             examples: Few-shot examples
+            system_suffix: Static instructions appended to the system prompt
             
         Returns:
             LLM response text
         """
         try:
-            messages = [SystemMessage(content=self.system_prompt)]
+            messages = self._build_messages(prompt, context, examples, system_suffix)
             
-            # Add context if provided
-            if context:
-                context_str = self._format_context(context)
-                messages.append(HumanMessage(content=f"Context:\n{context_str}"))
+            # Return cached response for identical message lists
+            cache_key = self._cache_key(messages) if self._cache_enabled() else None
+            if cache_key and cache_key in self._llm_cache:
+                self._llm_cache.move_to_end(cache_key)
+                return self._llm_cache[cache_key]
             
-            # Add examples if provided
-            if examples:
-                for example in examples:
-                    messages.append(HumanMessage(content=example.get("input", "")))
-                    messages.append(AIMessage(content=example.get("output", "")))
+            # Generate response
+            async with self._llm_semaphore:
+                response = await self.llm.ainvoke(messages)
             
-            # Add main prompt
-            messages.append(HumanMessage(content=prompt))
+            if cache_key:
+                self._llm_cache[cache_key] = response.content
+                if len(self._llm_cache) > settings.llm.response_cache_size:
+                    self._llm_cache.popitem(last=False)
             
-            # Generate response
-            response = await self.llm.ainvoke(messages)
             return response.content
             
         except Exception as e:
             logger.error(f"LLM error in {self.agent_type}: {e}")
             raise LLMError(settings.llm.provider, str(e))
     
+    def _build_messages(
+        self,
+        prompt: str,
+        context: Dict[str, Any] = None,
+        examples: List[Dict] = None,
+        system_suffix: str = None,
+    ) -> List:
+        """Assemble the chat messages: static system prefix first, dynamic data last."""
+        messages = [self._get_system_message(system_suffix)]
+        
+        # Add context if provided
+        if context:
+            context_str = self._format_context(context)
+            messages.append(HumanMessage(content=f"Context:\n{context_str}"))
+        
+        # Add examples if provided
+        if examples:
+            for example in examples:
+                messages.append(HumanMessage(content=example.get("input", "")))
+                messages.append(AIMessage(content=example.get("output", "")))
+        
+        # Add main prompt
+        messages.append(HumanMessage(content=prompt))
+        return messages
+    
+    def _get_system_message(self, system_suffix: str = None) -> SystemMessage:
+        """Return the (cached) system message, optionally extended with a static suffix."""
+        system_suffix = system_suffix or None
+        message = self._system_messages.get(system_suffix)
+        if message is None:
+            message = SystemMessage(content=f"{self.system_prompt}\n\n{system_suffix}")
+            if len(self._system_messages) < _SYSTEM_MESSAGE_CACHE_SIZE:
+                self._system_messages[system_suffix] = message
+        return message
+    
+    def _cache_enabled(self) -> bool:
+        """
+        Whether the raw response cache is active.
+        
+        Only deterministic (temperature 0) responses are cached unless
+        cache_nondeterministic is set, so the cache is opt-in at the default
+        temperature. Caches of results keyed on their inputs don't use this.
+        """
+        llm_settings = settings.llm
+        if llm_settings.response_cache_size <= 0:
+            return False
+        temperature = getattr(self.llm, "temperature", None) or 0
+        return temperature == 0 or llm_settings.cache_nondeterministic
+    
+    def _cache_key(self, messages: List) -> str:
+        """Hash the full message list into a response cache key."""
+        serialized = [(message.type, message.content) for message in messages]
+        payload = json.dumps(serialized, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    
     async def think_structured(
         self,
         prompt: str,
@@ -138,45 +248,55 @@ class BaseAgent(ABC):
         Returns:
             Parsed structured response
         """
-        import json
+        response = await self.think(
+            prompt, context, system_suffix=self._schema_instructions(output_schema)
+        )
         
-        schema_str = json.dumps(output_schema, indent=2)
+        # Parse JSON from response, unwrapping a markdown code fence if present
+        match = _FENCE_RE.match(response)
+        payload = (match.group(1) if match else response).strip()
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Failed to parse structured response: {e}")
+            return {"raw_response": payload, "parse_error": str(e)}
+    
+    def _schema_instructions(self, output_schema: Any) -> str:
+        """Build the static system-prompt suffix describing the output schema."""
+        schema_str = _render_schema(orjson.dumps(output_schema))
+        container = "array" if isinstance(output_schema, list) else "object"
         
-        structured_prompt = f"""{prompt}
-
-Respond with a valid JSON object matching this schema:
+        return f"""Respond with a valid JSON {container} matching this schema:
 {schema_str}
 
-Respond ONLY with the JSON object, no other text."""
-        
-        response = await self.think(structured_prompt, context)
-        
-        # Parse JSON from response
-        try:
-            # Try to extract JSON from response
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            
-            return json.loads(response.strip())
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse structured response: {e}")
-            return {"raw_response": response, "parse_error": str(e)}
+Respond ONLY with the JSON {container}, no other text."""
     
     def _format_context(self, context: Dict[str, Any]) -> str:
         """Format context dictionary for LLM consumption."""
+        try:
+            key = _freeze(context)
+        except TypeError:
+            # Values whose text form may change (e.g. models, sets) skip the cache
+            return self._render_context(context)
+        
+        formatted = _context_cache.get(key)
+        if formatted is None:
+            formatted = self._render_context(context)
+            _context_cache[key] = formatted
+            if len(_context_cache) > _CONTEXT_CACHE_SIZE:
+                _context_cache.popitem(last=False)
+        else:
+            _context_cache.move_to_end(key)
+        return formatted
+    
+    @staticmethod
+    def _render_context(context: Dict[str, Any]) -> str:
+        """Render a context dictionary as indented key/value lines."""
         lines = []
         for key, value in context.items():
             if isinstance(value, list):
                 lines.append(f"{key}:")
-                for item in value[:10]:  # Limit to 10 items
-                    lines.append(f"  - {item}")
-            elif isinstance(value, dict):
-                lines.append(f"{key}: {value}")
+                lines.extend(f"  - {item}" for item in value[:10])  # Limit to 10 items
             else:
                 lines.append(f"{key}: {value}")
         return "\n".join(lines)
@@ -223,12 +343,17 @@ Respond ONLY with the JSON object, no other text."""
         
         self.decision_history.append(decision)
         
-        # Store in memory if available
+        # Queue for a background batch write so logging never waits on memory I/O
         if self.memory_store:
-            try:
-                await self.memory_store.store_agent_decision(decision)
-            except Exception as e:
-                logger.warning(f"Failed to store decision in memory: {e}")
+            if self._flush_task is None or self._flush_task.done():
+                # Carry over anything the previous flush task left unwritten;
+                # a fresh queue keeps this safe if that task's loop has closed
+                pending = self._decision_queue
+                self._decision_queue = asyncio.Queue()
+                while pending is not None and not pending.empty():
+                    self._decision_queue.put_nowait(pending.get_nowait())
+                self._flush_task = asyncio.create_task(self._flush_decisions_loop())
+            self._decision_queue.put_nowait(decision)
         
         logger.info(
             f"[{self.agent_type}] Decision: {decision_type} - {action_taken[:50]}... "
@@ -237,6 +362,47 @@ Respond ONLY with the JSON object, no other text."""
         
         return decision
     
+    async def _flush_decisions_loop(self):
+        """Drain queued decisions into the memory store in batches."""
+        agent_settings = settings.agent
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._decision_queue.get()]
+            deadline = loop.time() + agent_settings.decision_flush_interval
+            
+            while len(batch) < agent_settings.decision_flush_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._decision_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self.memory_store.store_agent_decisions_batch(batch)
+            except Exception as e:
+                logger.warning(f"Failed to store decisions in memory: {e}")
+            finally:
+                for _ in batch:
+                    self._decision_queue.task_done()
+    
+    async def flush_decisions(self):
+        """Wait for queued decisions to be written and stop the flush task."""
+        if self._flush_task is None:
+            return
+        
+        if not self._flush_task.done():
+            await self._decision_queue.join()
+            self._flush_task.cancel()
+        
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+    
     @abstractmethod
     async def run(self, **kwargs) -> Dict[str, Any]:
         """
@@ -247,14 +413,61 @@ Respond ONLY with the JSON object, no other text."""
         """
         pass
     
+    async def aclose(self):
+        """Release resources held by the agent, such as pooled HTTP clients."""
+        if self._ping_http is not None:
+            await self._ping_http.aclose()
+            self._ping_http = None
+    
     async def health_check(self) -> bool:
-        """Check if the agent is functioning properly."""
+        """Check if the agent is functioning properly (cached for a short TTL)."""
+        if self._health_cache:
+            checked_at, healthy = self._health_cache
+            if time.monotonic() - checked_at < settings.agent.health_check_ttl:
+                return healthy
+        
         try:
             response = await self.think("Respond with 'OK' if you are functioning.")
-            return "OK" in response.upper()
+            healthy = "OK" in response.upper()
         except Exception as e:
             logger.error(f"Health check failed for {self.agent_type}: {e}")
+            healthy = False
+        
+        self._health_cache = (time.monotonic(), healthy)
+        return healthy
+    
+    async def ping(self, timeout: float = 5.0) -> bool:
+        """
+        Cheap liveness check: does the LLM endpoint answer successfully?
+        
+        Reuses the LLM's pooled HTTP client when it has one. OpenAI is asked
+        for its model list, which also exercises the API key; Ollama answers
+        on its root URL while the server is up.
+        """
+        llm_settings = settings.llm
+        if llm_settings.provider == "openai":
+            base_url = getattr(self.llm, "openai_api_base", None) or "https://api.openai.com/v1"
+            url = f"{base_url.rstrip('/')}/models"
+            headers = {"Authorization": f"Bearer {llm_settings.openai_api_key}"}
+        else:
+            url = getattr(self.llm, "base_url", None) or llm_settings.ollama_base_url
+            headers = {}
+        
+        client = getattr(self.llm, "http_async_client", None)
+        if client is None:
+            if self._ping_http is None:
+                self._ping_http = httpx.AsyncClient()
+            client = self._ping_http
+        
+        try:
+            response = await client.get(url, headers=headers, timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"Ping failed for {self.agent_type}: {e}")
             return False
+        
+        if not response.is_success:
+            logger.warning(f"Ping failed for {self.agent_type}: HTTP {response.status_code}")
+        return response.is_success
 
 
 class AgentContext:
@@ -269,10 +482,11 @@ class AgentContext:
         self.regulations: List[Dict] = []
         self.facilities: List[Dict] = []
         self.gaps: List[Dict] = []
+        self._gap_severity_counts: Counter = Counter()
         self.decisions: List[AgentDecision] = []
         self.alerts: List[Dict] = []
         self.metadata: Dict[str, Any] = {}
-        self.created_at = datetime.utcnow()
+        self.created_at = datetime.now(timezone.utc)
     
     def add_regulation(self, regulation: Dict):
         """Add a regulation to the context."""
@@ -285,6 +499,7 @@ class AgentContext:
     def add_gap(self, gap: Dict):
         """Add a compliance gap to the context."""
         self.gaps.append(gap)
+        self._gap_severity_counts[gap.get("severity", "unknown")] += 1
     
     def add_decision(self, decision: AgentDecision):
         """Add an agent decision to the context."""
@@ -294,6 +509,10 @@ class AgentContext:
         """Add an alert to the context."""
         self.alerts.append(alert)
     
+    def get_severity_counts(self) -> Dict[str, int]:
+        """Get the number of gaps at each severity level."""
+        return dict(self._gap_severity_counts)
+    
     def get_summary(self) -> Dict:
         """Get a summary of the context."""
         return {
@@ -302,6 +521,7 @@ class AgentContext:
             "gaps_count": len(self.gaps),
             "decisions_count": len(self.decisions),
             "alerts_count": len(self.alerts),
-            "critical_gaps": len([g for g in self.gaps if g.get("severity") == "critical"]),
+            "critical_gaps": self._gap_severity_counts["critical"],
+            "high_gaps": self._gap_severity_counts["high"],
             "created_at": self.created_at.isoformat(),
         }
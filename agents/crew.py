@@ -4,15 +4,16 @@ EnviroComply Crew
 CrewAI orchestration for multi-agent compliance analysis.
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 import asyncio
+import time
+import httpx
 from loguru import logger
 
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
 
-from .base_agent import AgentContext
+from .base_agent import BaseAgent, AgentContext
 from .regulation_monitor import RegulationMonitorAgent
 from .impact_assessor import ImpactAssessorAgent
 from .gap_analyzer import GapAnalyzerAgent
@@ -22,6 +23,111 @@ from core.models import ReportType
 from memory.weaviate_store import get_weaviate_store
 
 
+# Demo facilities used when the memory store is unavailable. Built once at
+# import time and shared read-only; agents never mutate facility records.
+_SAMPLE_FACILITIES: Tuple[Dict[str, Any], ...] = (
+    {
+        "facility_id": "permian-001",
+        "name": "Permian Basin Production Facility 1",
+        "facility_type": "production",
+        "state": "TX",
+        "county": "Midland",
+        "operator": "Demo Oil & Gas Co.",
+        "is_major_source": False,
+        "title_v_applicable": False,
+        "metadata": {
+            "emission_sources": [
+                {
+                    "id": "src-001",
+                    "name": "Tank Battery 1",
+                    "source_type": "storage",
+                    "equipment_type": "crude oil storage tank",
+                    "controlled": True,
+                    "control_equipment": "VRU",
+                },
+                {
+                    "id": "src-002",
+                    "name": "Wellhead Components",
+                    "source_type": "fugitive",
+                    "equipment_type": "wellhead",
+                    "last_inspection": "2024-09-15",
+                },
+                {
+                    "id": "src-003",
+                    "name": "Pneumatic Controllers",
+                    "source_type": "venting",
+                    "equipment_type": "high-bleed pneumatic",
+                },
+            ],
+            "permits": [
+                {
+                    "permit_number": "PBR-12345",
+                    "permit_type": "Permit by Rule",
+                    "status": "active",
+                    "expiration_date": "2025-12-31",
+                }
+            ],
+            "total_potential_emissions_tpy": {
+                "VOC": 45.5,
+                "NOx": 12.3,
+                "CO": 8.7,
+                "HAP": 3.2,
+                "CO2e": 15000,
+            },
+        },
+    },
+    {
+        "facility_id": "bakken-001",
+        "name": "Bakken Gathering Station",
+        "facility_type": "gathering",
+        "state": "ND",
+        "county": "McKenzie",
+        "operator": "Demo Oil & Gas Co.",
+        "is_major_source": True,
+        "title_v_applicable": True,
+        "metadata": {
+            "emission_sources": [
+                {
+                    "id": "src-010",
+                    "name": "Compressor Engine 1",
+                    "source_type": "combustion",
+                    "equipment_type": "natural gas compressor",
+                },
+                {
+                    "id": "src-011",
+                    "name": "Compressor Seals",
+                    "source_type": "fugitive",
+                    "equipment_type": "compressor rod packing",
+                    "last_inspection": "2024-06-01",
+                },
+                {
+                    "id": "src-012",
+                    "name": "Dehydrator",
+                    "source_type": "process",
+                    "equipment_type": "glycol dehydrator",
+                    "controlled": False,
+                },
+            ],
+            "permits": [
+                {
+                    "permit_number": "TV-2023-001",
+                    "permit_type": "Title V",
+                    "status": "active",
+                    "expiration_date": "2028-06-30",
+                }
+            ],
+            "total_potential_emissions_tpy": {
+                "VOC": 125.0,
+                "NOx": 85.0,
+                "CO": 45.0,
+                "HAP": 12.5,
+                "CO2e": 45000,
+            },
+        },
+    },
+)
+
+
 class EnviroComplyCrew:
     """
     Orchestrates the multi-agent compliance analysis workflow.
@@ -46,32 +152,54 @@ class EnviroComplyCrew:
         # CrewAI components
         self.crew = None
         self.llm = None
+        self._http_client = None
+        
+        # Bounds per-facility fan-out so bursts stay under provider rate limits
+        self._semaphore = asyncio.Semaphore(settings.agent.max_concurrency or 8)
         
     async def initialize(self):
         """Initialize the crew and all agents."""
         logger.info("Initializing EnviroComply Crew...")
         
-        # Connect to memory store
-        self.memory_store = await get_weaviate_store()
+        # One pooled HTTP/2 client so concurrent LLM calls reuse connections
+        llm_settings = settings.llm
+        self._http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=llm_settings.http_max_connections,
+                max_keepalive_connections=llm_settings.http_max_keepalive,
+            ),
+            timeout=httpx.Timeout(llm_settings.http_timeout, connect=5.0),
+        )
         
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            model=settings.llm.openai_model,
-            temperature=settings.llm.openai_temperature,
-            api_key=settings.llm.openai_api_key,
+        # Connect to memory store and build the shared LLM client concurrently
+        self.memory_store, self.llm = await asyncio.gather(
+            get_weaviate_store(),
+            asyncio.to_thread(BaseAgent._initialize_llm, self._http_client),
         )
         
-        # Initialize custom agents
-        self.regulation_monitor = RegulationMonitorAgent(memory_store=self.memory_store)
-        self.impact_assessor = ImpactAssessorAgent(memory_store=self.memory_store)
-        self.gap_analyzer = GapAnalyzerAgent(memory_store=self.memory_store)
-        self.report_generator = ReportGeneratorAgent(memory_store=self.memory_store)
+        # Initialize custom agents (sharing one LLM client and connection pool)
+        agent_kwargs = {"memory_store": self.memory_store, "llm": self.llm}
+        self.regulation_monitor = RegulationMonitorAgent(**agent_kwargs)
+        self.impact_assessor = ImpactAssessorAgent(**agent_kwargs)
+        self.gap_analyzer = GapAnalyzerAgent(**agent_kwargs)
+        self.report_generator = ReportGeneratorAgent(**agent_kwargs)
         
         # Create CrewAI agents for orchestration
         self._setup_crewai_agents()
         
         logger.info("EnviroComply Crew initialized successfully")
     
+    def _agents(self) -> list:
+        """Return the initialized custom agents."""
+        agents = [
+            self.regulation_monitor,
+            self.impact_assessor,
+            self.gap_analyzer,
+            self.report_generator,
+        ]
+        return [agent for agent in agents if agent]
+    
     def _setup_crewai_agents(self):
         """Set up CrewAI agent wrappers."""
         
@@ -139,7 +267,10 @@ class EnviroComplyCrew:
         Returns:
             Complete analysis results
         """
-        start_time = datetime.utcnow()
+        # One aware timestamp stamps the whole analysis: its ID, assessment
+        # dates and gap identification times
+        start_time = datetime.now(timezone.utc)
+        start_mono = time.monotonic()
         logger.info("Starting full compliance analysis...")
         
         results = {
@@ -152,6 +283,12 @@ class EnviroComplyCrew:
             "phases": {},
         }
         
+        # Facility loading is independent of regulatory monitoring, so start it
+        # now and let it overlap with Phase 1
+        facilities_task = None
+        if not facilities:
+            facilities_task = asyncio.create_task(self._load_facilities())
+        
         try:
             # Phase 1: Regulatory Monitoring
             logger.info("Phase 1: Scanning for regulatory changes...")
@@ -170,8 +307,8 @@ class EnviroComplyCrew:
             )
             
             # Load facilities if not provided
-            if not facilities:
-                facilities = await self._load_facilities()
+            if facilities_task:
+                facilities = await facilities_task
             
             # Add facilities to context
             for facility in facilities:
@@ -181,10 +318,34 @@ class EnviroComplyCrew:
             
             # Phase 2: Impact Assessment
             logger.info("Phase 2: Assessing regulatory impact on facilities...")
-            impact_results = await self.impact_assessor.run(
+            regulations = await self.impact_assessor.resolve_regulations(self.context.regulations)
+            classifications = self.impact_assessor.classify_facilities(facilities)
+            assessment_date = start_time.isoformat()
+            outcomes = await asyncio.gather(
+                *[
+                    self._bounded(self.impact_assessor.assess_one(
+                        facility, regulations, classification, assessment_date
+                    ))
+                    for facility, classification in zip(facilities, classifications)
+                ],
+                return_exceptions=True,
+            )
+            
+            # A failed facility is left out of the summary and analyzed for
+            # gaps without an assessment
+            assessments = []
+            for facility, outcome in zip(facilities, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Impact assessment failed for facility {facility.get('name')}: {outcome}")
+                    outcome = None
+                assessments.append(outcome)
+            assessed = [(f, a) for f, a in zip(facilities, assessments) if a is not None]
+            impact_results = await self.impact_assessor.summarize_assessments(
+                [f for f, _ in assessed],
+                regulations,
+                [a for _, a in assessed],
                 context=self.context,
-                facilities=facilities,
-                regulations=self.context.regulations,
+                assessment_date=assessment_date,
             )
             results["phases"]["impact_assessment"] = {
                 "assessments": len(impact_results.get("assessments", [])),
@@ -194,10 +355,31 @@ class EnviroComplyCrew:
             
             # Phase 3: Gap Analysis
             logger.info("Phase 3: Identifying compliance gaps...")
-            gap_results = await self.gap_analyzer.run(
-                context=self.context,
-                facilities=facilities,
-                impact_assessments=impact_results.get("assessments", []),
+            today = date.today()
+            identified_at = start_time.isoformat()
+            id_prefix = start_time.strftime('%Y%m%d%H%M%S')
+            outcomes = await asyncio.gather(
+                *[
+                    self._bounded(self.gap_analyzer.analyze_one(
+                        facility,
+                        assessment,
+                        today=today,
+                        identified_at=identified_at,
+                        id_prefix=id_prefix,
+                    ))
+                    for facility, assessment in zip(facilities, assessments)
+                ],
+                return_exceptions=True,
+            )
+            
+            facility_gaps = []
+            for facility, outcome in zip(facilities, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Gap analysis failed for facility {facility.get('name')}: {outcome}")
+                    outcome = []
+                facility_gaps.append(outcome)
+            gap_results = await self.gap_analyzer.summarize_gaps(
+                facilities, facility_gaps, context=self.context,
             )
             results["phases"]["gap_analysis"] = gap_results.get("gap_summary", {})
             results["gaps_identified"] = gap_results.get("gap_summary", {}).get("total", 0)
@@ -205,14 +387,27 @@ class EnviroComplyCrew:
             # Phase 4: Report Generation
             logger.info("Phase 4: Generating reports...")
             report_types = report_types or [ReportType.GAP_ANALYSIS, ReportType.EXECUTIVE_SUMMARY]
-            
-            for report_type in report_types:
-                report = await self.report_generator.run(
-                    context=self.context,
-                    report_type=report_type,
-                    facilities=facilities,
-                    gaps=self.context.gaps,
-                )
+
+            # Reports are independent LLM round-trips, so generate them
+            # concurrently against a snapshot of the gaps found so far.
+            gaps = list(self.context.gaps)
+            reports = await asyncio.gather(
+                *[
+                    self.report_generator.run(
+                        context=self.context,
+                        report_type=report_type,
+                        facilities=facilities,
+                        gaps=gaps,
+                    )
+                    for report_type in report_types
+                ],
+                return_exceptions=True,
+            )
+
+            for report_type, report in zip(report_types, reports):
+                if isinstance(report, Exception):
+                    logger.error(f"Failed to generate {report_type.value} report: {report}")
+                    continue
                 results["reports_generated"].append({
                     "type": report_type.value,
                     "file_path": report.get("file_path"),
@@ -226,16 +421,23 @@ class EnviroComplyCrew:
         except Exception as e:
             logger.error(f"Analysis failed: {e}")
             results["error"] = str(e)
+            if facilities_task and not facilities_task.done():
+                facilities_task.cancel()
         
         # Finalize
-        end_time = datetime.utcnow()
-        results["completed_at"] = end_time.isoformat()
-        results["duration_seconds"] = (end_time - start_time).total_seconds()
+        duration = time.monotonic() - start_mono
+        results["completed_at"] = (start_time + timedelta(seconds=duration)).isoformat()
+        results["duration_seconds"] = duration
         
         logger.info(f"Analysis completed in {results['duration_seconds']:.1f} seconds")
         
         return results
     
+    async def _bounded(self, coro):
+        """Await a coroutine under the crew's concurrency limit."""
+        async with self._semaphore:
+            return await coro
+    
     async def run_monitoring_only(
         self,
         lookback_days: int = 30,
@@ -311,107 +513,7 @@ class EnviroComplyCrew:
     
     def _get_sample_facilities(self) -> List[Dict]:
         """Get sample facilities for demonstration."""
-        return [
-            {
-                "facility_id": "permian-001",
-                "name": "Permian Basin Production Facility 1",
-                "facility_type": "production",
-                "state": "TX",
-                "county": "Midland",
-                "operator": "Demo Oil & Gas Co.",
-                "is_major_source": False,
-                "title_v_applicable": False,
-                "metadata": {
-                    "emission_sources": [
-                        {
-                            "id": "src-001",
-                            "name": "Tank Battery 1",
-                            "source_type": "storage",
-                            "equipment_type": "crude oil storage tank",
-                            "controlled": True,
-                            "control_equipment": "VRU",
-                        },
-                        {
-                            "id": "src-002",
-                            "name": "Wellhead Components",
-                            "source_type": "fugitive",
-                            "equipment_type": "wellhead",
-                            "last_inspection": "2024-09-15",
-                        },
-                        {
-                            "id": "src-003",
-                            "name": "Pneumatic Controllers",
-                            "source_type": "venting",
-                            "equipment_type": "high-bleed pneumatic",
-                        },
-                    ],
-                    "permits": [
-                        {
-                            "permit_number": "PBR-12345",
-                            "permit_type": "Permit by Rule",
-                            "status": "active",
-                            "expiration_date": "2025-12-31",
-                        }
-                    ],
-                    "total_potential_emissions_tpy": {
-                        "VOC": 45.5,
-                        "NOx": 12.3,
-                        "CO": 8.7,
-                        "HAP": 3.2,
-                        "CO2e": 15000,
-                    },
-                },
-            },
-            {
-                "facility_id": "bakken-001",
-                "name": "Bakken Gathering Station",
-                "facility_type": "gathering",
-                "state": "ND",
-                "county": "McKenzie",
-                "operator": "Demo Oil & Gas Co.",
-                "is_major_source": True,
-                "title_v_applicable": True,
-                "metadata": {
-                    "emission_sources": [
-                        {
-                            "id": "src-010",
-                            "name": "Compressor Engine 1",
-                            "source_type": "combustion",
-                            "equipment_type": "natural gas compressor",
-                        },
-                        {
-                            "id": "src-011",
-                            "name": "Compressor Seals",
-                            "source_type": "fugitive",
-                            "equipment_type": "compressor rod packing",
-                            "last_inspection": "2024-06-01",
-                        },
-                        {
-                            "id": "src-012",
-                            "name": "Dehydrator",
-                            "source_type": "process",
-                            "equipment_type": "glycol dehydrator",
-                            "controlled": False,
-                        },
-                    ],
-                    "permits": [
-                        {
-                            "permit_number": "TV-2023-001",
-                            "permit_type": "Title V",
-                            "status": "active",
-                            "expiration_date": "2028-06-30",
-                        }
-                    ],
-                    "total_potential_emissions_tpy": {
-                        "VOC": 125.0,
-                        "NOx": 85.0,
-                        "CO": 45.0,
-                        "HAP": 12.5,
-                        "CO2e": 45000,
-                    },
-                },
-            },
-        ]
+        return list(_SAMPLE_FACILITIES)
     
     def get_context_summary(self) -> Dict[str, Any]:
         """Get summary of current analysis context."""
@@ -419,8 +521,13 @@ class EnviroComplyCrew:
     
     async def cleanup(self):
         """Clean up resources."""
+        await asyncio.gather(*[agent.flush_decisions() for agent in self._agents()])
+        await asyncio.gather(*[agent.aclose() for agent in self._agents()])
+        
         if self.memory_store:
             await self.memory_store.disconnect()
+        if self._http_client:
+            await self._http_client.aclose()
         logger.info("EnviroComply Crew cleaned up")
 
 
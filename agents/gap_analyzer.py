@@ -4,8 +4,14 @@ Gap Analyzer Agent
 Identifies compliance gaps between current operations and regulatory requirements.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+from collections import Counter
+from operator import itemgetter
 from datetime import datetime, date, timedelta
+from functools import lru_cache
+import asyncio
+import itertools
+import numpy as np
 from loguru import logger
 
 from .base_agent import BaseAgent, AgentContext
@@ -13,6 +19,82 @@ from core.config import settings
 from core.models import ComplianceGap, GapSeverity, GapStatus
 
 
+# LLM-derived gap IDs: a per-run timestamp prefix plus a monotonic
+# sequence, so IDs stay unique without formatting a timestamp per gap
+_gap_sequence = itertools.count()
+
+# Base risk score by gap severity
+_SEVERITY_SCORES = {
+    "critical": 0.95,
+    "high": 0.75,
+    "medium": 0.50,
+    "low": 0.25,
+}
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_date(value: str) -> date:
+    """Parse an ISO date string; permit and deadline dates repeat often."""
+    return date.fromisoformat(value)
+
+
+def _to_date(value: Union[str, date]) -> date:
+    """Coerce a date, datetime, or ISO date string to a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _parse_iso_date(str(value))
+
+
+def _count_high_bleed(is_high_bleed_type: np.ndarray, bleed_rate: np.ndarray) -> int:
+    """Count controllers that are high-bleed by type or bleed above 6 scfh."""
+    return int(np.count_nonzero(is_high_bleed_type | (bleed_rate > 6)))
+
+
+def _count_uncontrolled(controlled: np.ndarray) -> int:
+    """Count vessels without emission controls."""
+    return len(controlled) - int(np.count_nonzero(controlled))
+
+
+def _oldest_inspection(last_inspections: np.ndarray) -> Optional[date]:
+    """Return the oldest recorded inspection date, ignoring NaT entries."""
+    recorded = last_inspections[~np.isnat(last_inspections)]
+    return recorded.min().astype(date) if len(recorded) else None
+
+
+def _source_columns(sources: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Extract the emission source fields used by the standard checks into
+    column arrays, so each check is a vectorized mask over the facility.
+    
+    Inspection dates are only read for fugitive sources and bleed rates only
+    for pneumatic controllers, so odd values elsewhere can't fail a check.
+    Missing or unread inspection dates are NaT; bleed rates are 0.
+    """
+    equipment_types = np.array([(s.get("equipment_type") or "").lower() for s in sources], dtype=str)
+    source_type = np.array([s.get("source_type") or "" for s in sources], dtype=str)
+    is_pneumatic = np.char.find(equipment_types, "pneumatic") >= 0
+    
+    bleed_rate = np.zeros(len(sources), dtype=np.float64)
+    for i in np.flatnonzero(is_pneumatic):
+        bleed_rate[i] = sources[i].get("bleed_rate") or 0
+    
+    last_inspection = np.full(len(sources), np.datetime64("NaT"), dtype="datetime64[D]")
+    for i in np.flatnonzero(source_type == "fugitive"):
+        if sources[i].get("last_inspection"):
+            last_inspection[i] = _to_date(sources[i]["last_inspection"])
+    
+    return {
+        "source_type": source_type,
+        "is_pneumatic": is_pneumatic,
+        "is_high_bleed_type": np.char.find(equipment_types, "high") >= 0,
+        "bleed_rate": bleed_rate,
+        "controlled": np.array([bool(s.get("controlled", False)) for s in sources], dtype=bool),
+        "last_inspection": last_inspection,
+    }
+
+
 class GapAnalyzerAgent(BaseAgent):
     """
     Agent responsible for identifying compliance gaps and
@@ -90,83 +172,161 @@ Be thorough but practical - focus on actionable gaps that can be addressed."""
         if context:
             facilities = facilities or context.facilities
             if not impact_assessments:
-                impact_assessments = [
-                    context.metadata.get(f"impact_{f.get('facility_id')}")
-                    for f in facilities
-                    if context.metadata.get(f"impact_{f.get('facility_id')}")
-                ]
+                # Collect stored assessments in one pass over the metadata
+                stored = {
+                    key[len("impact_"):]: value
+                    for key, value in context.metadata.items()
+                    if key.startswith("impact_") and value
+                }
+                impact_assessments = []
+                for f in facilities:
+                    assessment = stored.get(f"{f.get('facility_id')}")
+                    if assessment:
+                        impact_assessments.append(assessment)
         
         if not facilities:
             logger.warning("No facilities provided for gap analysis")
             return {"gaps": [], "summary": "No facilities to analyze"}
         
+        # Index impact assessments by facility for O(1) lookups
+        impact_by_id = {}
+        for assessment in impact_assessments or []:
+            if isinstance(assessment, dict) and assessment.get("facility_id"):
+                # Keep the first assessment per facility, as the linear scan did
+                impact_by_id.setdefault(assessment["facility_id"], assessment)
+        
+        impacts = [impact_by_id.get(facility.get("facility_id")) for facility in facilities]
+        today = date.today()
+        now = datetime.utcnow()
+        identified_at = now.isoformat()
+        id_prefix = now.strftime('%Y%m%d%H%M%S')
+        
+        # Facilities are independent, so analyze them concurrently; LLM calls
+        # are bounded by the agent's request semaphore
+        outcomes = await asyncio.gather(
+            *[
+                self.analyze_one(
+                    facility,
+                    impact,
+                    today=today,
+                    identified_at=identified_at,
+                    id_prefix=id_prefix,
+                )
+                for facility, impact in zip(facilities, impacts)
+            ],
+            return_exceptions=True,
+        )
+        
+        facility_gaps = []
+        for facility, outcome in zip(facilities, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Gap analysis failed for facility {facility.get('name')}: {outcome}")
+                outcome = []
+            facility_gaps.append(outcome)
+        
+        return await self.summarize_gaps(facilities, facility_gaps, context)
+    
+    async def analyze_one(
+        self,
+        facility: Dict,
+        impact_assessment: Dict = None,
+        today: date = None,
+        identified_at: str = None,
+        id_prefix: str = None,
+    ) -> List[Dict]:
+        """
+        Identify compliance gaps for a single facility.
+        
+        Facilities are independent of each other, so callers may run
+        several of these concurrently. ``today`` pins the reference date
+        for deadline checks, ``identified_at`` the timestamp stamped on
+        each gap and ``id_prefix`` the run prefix of generated gap IDs;
+        all default to now.
+        """
+        logger.opt(lazy=True).info("Analyzing gaps for facility: {}", lambda: facility.get("name"))
+        now = datetime.utcnow()
+        return await self._analyze_facility_gaps(
+            facility,
+            impact_assessment,
+            today or date.today(),
+            identified_at or now.isoformat(),
+            id_prefix or now.strftime('%Y%m%d%H%M%S'),
+        )
+    
+    async def summarize_gaps(
+        self,
+        facilities: List[Dict],
+        facility_gaps: List[List[Dict]],
+        context: AgentContext = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate per-facility gaps into run results.
+        
+        Args:
+            facilities: Facilities that were analyzed
+            facility_gaps: Gap lists in the same order as facilities
+            context: Shared agent context
+        
+        Returns:
+            Dictionary with identified gaps and recommendations
+        """
+        all_gaps = [gap for gaps in facility_gaps for gap in gaps]
+        severity_counts = Counter(gap.get("severity", "medium") for gap in all_gaps)
+        
         results = {
-            "gaps": [],
+            "gaps": all_gaps,
             "gap_summary": {
-                "critical": 0,
-                "high": 0,
-                "medium": 0,
-                "low": 0,
-                "total": 0,
+                "critical": severity_counts["critical"],
+                "high": severity_counts["high"],
+                "medium": severity_counts["medium"],
+                "low": severity_counts["low"],
+                "total": len(all_gaps),
             },
             "priority_actions": [],
-            "estimated_total_remediation_cost": 0,
+            "estimated_total_remediation_cost": sum(gap.get("estimated_cost") or 0 for gap in all_gaps),
             "analysis_date": datetime.utcnow().isoformat(),
         }
         
-        for facility in facilities:
-            facility_id = facility.get("facility_id")
-            logger.info(f"Analyzing gaps for facility: {facility.get('name')}")
-            
-            # Find corresponding impact assessment
-            impact = next(
-                (a for a in (impact_assessments or []) if a.get("facility_id") == facility_id),
-                None
-            )
-            
-            # Perform gap analysis
-            facility_gaps = await self._analyze_facility_gaps(facility, impact)
-            
-            for gap in facility_gaps:
-                results["gaps"].append(gap)
-                results["gap_summary"][gap.get("severity", "medium")] += 1
-                results["gap_summary"]["total"] += 1
-                results["estimated_total_remediation_cost"] += gap.get("estimated_cost", 0)
-                
+        # Priority actions paired with their sort key, computed once on append
+        keyed_actions = []
+        
+        for facility, gaps in zip(facilities, facility_gaps):
+            for gap in gaps:
                 # Add to context
                 if context:
                     context.add_gap(gap)
                 
                 # Track priority actions
-                if gap.get("severity") in ["critical", "high"]:
-                    results["priority_actions"].append({
-                        "facility": facility.get("name"),
-                        "gap": gap.get("title"),
-                        "severity": gap.get("severity"),
-                        "deadline": gap.get("regulatory_deadline"),
-                        "action": gap.get("recommended_action"),
-                    })
+                severity = gap.get("severity")
+                if severity in ["critical", "high"]:
+                    deadline = gap.get("regulatory_deadline")
+                    keyed_actions.append((
+                        (0 if severity == "critical" else 1, deadline or "9999-99-99"),
+                        {
+                            "facility": facility.get("name"),
+                            "gap": gap.get("title"),
+                            "severity": severity,
+                            "deadline": deadline,
+                            "action": gap.get("recommended_action"),
+                        },
+                    ))
         
         # Sort priority actions
-        results["priority_actions"] = sorted(
-            results["priority_actions"],
-            key=lambda x: (
-                0 if x.get("severity") == "critical" else 1,
-                x.get("deadline") or "9999-99-99"
-            )
-        )
+        keyed_actions.sort(key=itemgetter(0))
+        results["priority_actions"] = [action for _, action in keyed_actions]
         
-        # Log decision
+        # Log decision; only the summary is persisted, never the gap list
+        facility_ids = [f.get("facility_id") for f in facilities]
         await self.log_decision(
             decision_type="gap_analysis",
-            action_taken=f"Analyzed {len(facilities)} facilities",
+            action_taken=f"Analyzed {len(facility_ids)} facilities",
             reasoning=f"Identified {results['gap_summary']['total']} gaps: "
                      f"{results['gap_summary']['critical']} critical, "
                      f"{results['gap_summary']['high']} high",
             confidence=0.88,
-            input_data={"facility_count": len(facilities)},
+            input_data={"facility_count": len(facility_ids)},
             output_data=results["gap_summary"],
-            facility_ids=[f.get("facility_id") for f in facilities],
+            facility_ids=facility_ids,
         )
         
         return results
@@ -174,75 +334,99 @@ Be thorough but practical - focus on actionable gaps that can be addressed."""
     async def _analyze_facility_gaps(
         self,
         facility: Dict,
-        impact_assessment: Dict = None
+        impact_assessment: Dict = None,
+        today: date = None,
+        identified_at: str = None,
+        id_prefix: str = None,
     ) -> List[Dict]:
         """Analyze gaps for a single facility."""
         
-        gaps = []
-        
-        # 1. Analyze regulatory compliance gaps
-        regulatory_gaps = await self._check_regulatory_compliance(facility, impact_assessment)
-        gaps.extend(regulatory_gaps)
-        
-        # 2. Analyze permit gaps
-        permit_gaps = await self._check_permit_compliance(facility)
-        gaps.extend(permit_gaps)
-        
-        # 3. Analyze monitoring/recordkeeping gaps
-        monitoring_gaps = await self._check_monitoring_compliance(facility)
-        gaps.extend(monitoring_gaps)
+        # The checks are independent, so run them concurrently:
+        # 1. Regulatory compliance gaps
+        # 2. Permit gaps
+        # 3. Monitoring/recordkeeping gaps
+        # 4. Equipment/operational gaps
+        regulatory_gaps, permit_gaps, monitoring_gaps, equipment_gaps = await asyncio.gather(
+            self._check_regulatory_compliance(facility, impact_assessment, today, id_prefix),
+            self._check_permit_compliance(facility, today),
+            self._check_monitoring_compliance(facility),
+            self._check_equipment_compliance(facility),
+        )
         
-        # 4. Analyze equipment/operational gaps
-        equipment_gaps = await self._check_equipment_compliance(facility)
-        gaps.extend(equipment_gaps)
+        gaps = [*regulatory_gaps, *permit_gaps, *monitoring_gaps, *equipment_gaps]
         
-        # Calculate risk scores for all gaps
-        for gap in gaps:
-            gap["risk_score"] = self._calculate_risk_score(gap)
+        # Calculate risk scores for all gaps and stamp them with this run
+        identified_at = identified_at or datetime.utcnow().isoformat()
+        for gap, risk_score in zip(gaps, self._calculate_risk_scores(gaps, today)):
+            gap["risk_score"] = risk_score
             gap["facility_id"] = facility.get("facility_id")
+            gap["identified_at"] = identified_at
         
         return gaps
     
     async def _check_regulatory_compliance(
         self,
         facility: Dict,
-        impact_assessment: Dict = None
+        impact_assessment: Dict = None,
+        today: date = None,
+        id_prefix: str = None,
     ) -> List[Dict]:
         """Check compliance against applicable regulations."""
         
-        gaps = []
+        high_impacts = []
         
         # Use impact assessment if available
         if impact_assessment:
-            for reg_impact in impact_assessment.get("regulation_impacts", []):
-                if reg_impact.get("impact_level") in ["critical", "high"]:
-                    # Generate gap from identified issues
-                    gap = await self._create_gap_from_impact(facility, reg_impact)
-                    if gap:
-                        gaps.append(gap)
-        
-        # Also check standard regulatory areas
-        standard_gaps = await self._check_standard_requirements(facility)
+            high_impacts = [
+                reg_impact for reg_impact in impact_assessment.get("regulation_impacts", [])
+                if reg_impact.get("impact_level") in ["critical", "high"]
+            ]
+        
+        # Generate gaps from identified issues alongside the standard
+        # regulatory area checks
+        gaps, standard_gaps = await asyncio.gather(
+            self._create_gaps_from_impacts(facility, high_impacts, id_prefix),
+            self._check_standard_requirements(facility, today),
+        )
+        
         gaps.extend(standard_gaps)
         
         return gaps
     
-    async def _create_gap_from_impact(
+    async def _create_gaps_from_impacts(
         self,
         facility: Dict,
-        reg_impact: Dict
-    ) -> Optional[Dict]:
-        """Create a gap record from a regulation impact assessment."""
+        reg_impacts: List[Dict],
+        id_prefix: str = None,
+    ) -> List[Dict]:
+        """
+        Create gap records from regulation impact assessments.
+        
+        All impacts for the facility are evaluated in one structured LLM
+        call; each returned entry refers back to its impact by number.
+        Gap IDs start with ``id_prefix``, the run's timestamp.
+        """
+        if not reg_impacts:
+            return []
+        
+        id_prefix = id_prefix or datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        
+        impact_lines = "\n\n".join(
+            f"""{number}. Regulation: {reg_impact.get('regulation_citation')}
+   Impact Level: {reg_impact.get('impact_level')}
+   Primary Concern: {reg_impact.get('primary_concern')}
+   Required Actions: {reg_impact.get('required_actions', [])}"""
+            for number, reg_impact in enumerate(reg_impacts, start=1)
+        )
         
-        prompt = f"""Based on this regulatory impact, identify if there is a compliance gap:
+        prompt = f"""Based on these regulatory impacts, identify which represent a compliance gap:
 
 Facility: {facility.get('name')} ({facility.get('facility_type')})
-Regulation: {reg_impact.get('regulation_citation')}
-Impact Level: {reg_impact.get('impact_level')}
-Primary Concern: {reg_impact.get('primary_concern')}
-Required Actions: {reg_impact.get('required_actions', [])}
 
-If there is a gap, provide:
+Impacts:
+{impact_lines}
+
+For each impact, report its number and whether there is a gap. If there is a gap, provide:
 1. Clear title for the gap
 2. Detailed description
 3. Severity (critical/high/medium/low)
@@ -250,29 +434,55 @@ If there is a gap, provide:
 5. Estimated cost to remediate
 6. Timeline to address
 
-If no gap exists (facility is compliant), respond with NULL."""
+If no gap exists for an impact (facility is compliant), set has_gap to false."""
 
         result = await self.think_structured(
             prompt=prompt,
             output_schema={
-                "has_gap": "boolean",
-                "title": "short descriptive title",
-                "description": "detailed description of the gap",
-                "severity": "critical/high/medium/low",
-                "recommended_action": "specific corrective action",
-                "estimated_cost": 0,
-                "timeline_days": 0,
-                "regulatory_deadline": "YYYY-MM-DD or null",
-                "evidence": ["supporting evidence points"],
-                "enforcement_risk": "description of enforcement risk",
+                "gaps": [{
+                    "index": "impact number from the list above",
+                    "has_gap": "boolean",
+                    "title": "short descriptive title",
+                    "description": "detailed description of the gap",
+                    "severity": "critical/high/medium/low",
+                    "recommended_action": "specific corrective action",
+                    "estimated_cost": 0,
+                    "timeline_days": 0,
+                    "regulatory_deadline": "YYYY-MM-DD or null",
+                    "evidence": ["supporting evidence points"],
+                    "enforcement_risk": "description of enforcement risk",
+                }],
             }
         )
         
-        if not result.get("has_gap"):
-            return None
-        
+        # Map entries back to their impacts, keeping impact order and the
+        # first entry reported for each impact
+        findings: Dict[int, Dict] = {}
+        for item in result.get("gaps") or []:
+            if not isinstance(item, dict) or not item.get("has_gap"):
+                continue
+            try:
+                index = int(item.get("index")) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(reg_impacts):
+                findings.setdefault(index, item)
+        
+        return [
+            self._gap_from_finding(facility, reg_impacts[index], findings[index], id_prefix)
+            for index in sorted(findings)
+        ]
+    
+    def _gap_from_finding(
+        self,
+        facility: Dict,
+        reg_impact: Dict,
+        result: Dict,
+        id_prefix: str,
+    ) -> Dict:
+        """Build a gap record from an LLM finding for one impact."""
         return {
-            "id": f"gap_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{facility.get('facility_id')[:8]}",
+            "id": f"gap_{id_prefix}_{next(_gap_sequence):06x}_{(facility.get('facility_id') or '')[:8]}",
             "title": result.get("title"),
             "description": result.get("description"),
             "severity": result.get("severity", "medium"),
@@ -284,35 +494,43 @@ If no gap exists (facility is compliant), respond with NULL."""
             "regulatory_deadline": result.get("regulatory_deadline"),
             "evidence": result.get("evidence", []),
             "enforcement_risk": result.get("enforcement_risk"),
-            "identified_at": datetime.utcnow().isoformat(),
         }
     
-    async def _check_standard_requirements(self, facility: Dict) -> List[Dict]:
+    async def _check_standard_requirements(self, facility: Dict, today: date = None) -> List[Dict]:
         """Check against standard O&G compliance requirements."""
         
         gaps = []
         metadata = facility.get("metadata", {})
         sources = metadata.get("emission_sources", [])
-        permits = metadata.get("permits", [])
+        
+        if not sources:
+            return gaps
+        
+        # Bucket sources by the checks that apply to them as column masks
+        columns = _source_columns(sources)
+        fugitive = columns["source_type"] == "fugitive"
+        storage = columns["source_type"] == "storage"
+        pneumatic = columns["is_pneumatic"]
         
         # Check LDAR requirements
-        fugitive_sources = [s for s in sources if s.get("source_type") == "fugitive"]
-        if fugitive_sources:
-            ldar_gap = await self._check_ldar_compliance(facility, fugitive_sources)
+        if fugitive.any():
+            ldar_gap = await self._check_ldar_compliance(
+                facility, columns["last_inspection"][fugitive], today
+            )
             if ldar_gap:
                 gaps.append(ldar_gap)
         
         # Check storage vessel requirements
-        storage_sources = [s for s in sources if s.get("source_type") == "storage"]
-        if storage_sources:
-            storage_gap = await self._check_storage_compliance(facility, storage_sources)
+        if storage.any():
+            storage_gap = await self._check_storage_compliance(facility, columns["controlled"][storage])
             if storage_gap:
                 gaps.append(storage_gap)
         
         # Check pneumatic controller requirements
-        pneumatic_equipment = [s for s in sources if "pneumatic" in s.get("equipment_type", "").lower()]
-        if pneumatic_equipment:
-            pneumatic_gap = await self._check_pneumatic_compliance(facility, pneumatic_equipment)
+        if pneumatic.any():
+            pneumatic_gap = await self._check_pneumatic_compliance(
+                facility, columns["is_high_bleed_type"][pneumatic], columns["bleed_rate"][pneumatic]
+            )
             if pneumatic_gap:
                 gaps.append(pneumatic_gap)
         
@@ -321,19 +539,23 @@ If no gap exists (facility is compliant), respond with NULL."""
     async def _check_ldar_compliance(
         self,
         facility: Dict,
-        fugitive_sources: List[Dict]
+        last_inspections: np.ndarray,
+        today: date = None,
     ) -> Optional[Dict]:
-        """Check LDAR (Leak Detection and Repair) compliance."""
+        """
+        Check LDAR (Leak Detection and Repair) compliance.
         
-        # Check last inspection dates
-        last_inspections = [
-            s.get("last_inspection") for s in fugitive_sources
-            if s.get("last_inspection")
-        ]
+        ``last_inspections`` holds one datetime64 per fugitive source, NaT
+        where no inspection is recorded.
+        """
+        
+        facility_key = (facility.get("facility_id") or "")[:8]
         
-        if not last_inspections:
+        oldest_inspection = _oldest_inspection(last_inspections)
+        
+        if oldest_inspection is None:
             return {
-                "id": f"gap_ldar_{facility.get('facility_id')[:8]}",
+                "id": f"gap_ldar_{facility_key}",
                 "title": "LDAR Program Not Documented",
                 "description": "No LDAR inspection records found for fugitive emission sources. "
                               "NSPS OOOOa requires quarterly surveys using OGI or Method 21.",
@@ -347,16 +569,14 @@ If no gap exists (facility is compliant), respond with NULL."""
                 "timeline_days": 30,
                 "evidence": ["No inspection records in facility profile"],
                 "enforcement_risk": "High - LDAR is a top EPA enforcement priority",
-                "identified_at": datetime.utcnow().isoformat(),
             }
         
         # Check if surveys are current (within 90 days for quarterly requirement)
-        oldest_inspection = min(last_inspections)
-        days_since = (date.today() - date.fromisoformat(str(oldest_inspection))).days
+        days_since = ((today or date.today()) - oldest_inspection).days
         
         if days_since > 90:
             return {
-                "id": f"gap_ldar_overdue_{facility.get('facility_id')[:8]}",
+                "id": f"gap_ldar_overdue_{facility_key}",
                 "title": "LDAR Survey Overdue",
                 "description": f"Last LDAR survey was {days_since} days ago. Quarterly surveys "
                               "required under NSPS OOOOa for wellhead and compressor components.",
@@ -368,7 +588,6 @@ If no gap exists (facility is compliant), respond with NULL."""
                 "estimated_cost": 5000,
                 "timeline_days": 14,
                 "evidence": [f"Last survey: {oldest_inspection}", f"Days overdue: {days_since - 90}"],
-                "identified_at": datetime.utcnow().isoformat(),
             }
         
         return None
@@ -376,31 +595,27 @@ If no gap exists (facility is compliant), respond with NULL."""
     async def _check_storage_compliance(
         self,
         facility: Dict,
-        storage_sources: List[Dict]
+        controlled: np.ndarray
     ) -> Optional[Dict]:
-        """Check storage vessel compliance."""
+        """Check storage vessel compliance from each vessel's control flag."""
         
         # Check for uncontrolled storage vessels
-        uncontrolled = [
-            s for s in storage_sources
-            if not s.get("controlled", False)
-        ]
+        uncontrolled = _count_uncontrolled(controlled)
         
         if uncontrolled:
             return {
-                "id": f"gap_storage_{facility.get('facility_id')[:8]}",
+                "id": f"gap_storage_{(facility.get('facility_id') or '')[:8]}",
                 "title": "Uncontrolled Storage Vessels",
-                "description": f"Found {len(uncontrolled)} storage vessels without emission controls. "
+                "description": f"Found {uncontrolled} storage vessels without emission controls. "
                               "NSPS OOOOa requires 95% control efficiency for vessels with PTE ≥6 tpy VOC.",
                 "severity": "high",
                 "status": "open",
                 "regulation_id": "40 CFR 60.5395a",
                 "recommended_action": "Evaluate PTE for each vessel. Install VRU or combust emissions "
                                      "for vessels exceeding threshold. Document low-production exemptions.",
-                "estimated_cost": 50000 * len(uncontrolled),
+                "estimated_cost": 50000 * uncontrolled,
                 "timeline_days": 180,
-                "evidence": [f"{len(uncontrolled)} uncontrolled vessels identified"],
-                "identified_at": datetime.utcnow().isoformat(),
+                "evidence": [f"{uncontrolled} uncontrolled vessels identified"],
             }
         
         return None
@@ -408,92 +623,105 @@ If no gap exists (facility is compliant), respond with NULL."""
     async def _check_pneumatic_compliance(
         self,
         facility: Dict,
-        pneumatic_equipment: List[Dict]
+        is_high_bleed_type: np.ndarray,
+        bleed_rate: np.ndarray
     ) -> Optional[Dict]:
-        """Check pneumatic controller compliance."""
+        """
+        Check pneumatic controller compliance.
+        
+        Controllers count as high-bleed by equipment type or by a bleed
+        rate above the 6 scfh threshold.
+        """
         
         # Check for high-bleed controllers
-        high_bleed = [
-            p for p in pneumatic_equipment
-            if "high" in p.get("equipment_type", "").lower() or
-               p.get("bleed_rate", 0) > 6  # scfh threshold
-        ]
+        high_bleed = _count_high_bleed(is_high_bleed_type, bleed_rate)
         
         if high_bleed:
             return {
-                "id": f"gap_pneumatic_{facility.get('facility_id')[:8]}",
+                "id": f"gap_pneumatic_{(facility.get('facility_id') or '')[:8]}",
                 "title": "High-Bleed Pneumatic Controllers",
-                "description": f"Found {len(high_bleed)} high-bleed pneumatic controllers. "
+                "description": f"Found {high_bleed} high-bleed pneumatic controllers. "
                               "NSPS OOOOb requires low-bleed or zero-emission controllers at wellsites.",
                 "severity": "medium",
                 "status": "open",
                 "regulation_id": "40 CFR 60.5390a",
                 "recommended_action": "Replace high-bleed controllers with low-bleed (<6 scfh) or "
                                      "zero-emission alternatives. Document functional need exemptions.",
-                "estimated_cost": 2500 * len(high_bleed),
+                "estimated_cost": 2500 * high_bleed,
                 "timeline_days": 365,
-                "evidence": [f"{len(high_bleed)} high-bleed controllers identified"],
-                "identified_at": datetime.utcnow().isoformat(),
+                "evidence": [f"{high_bleed} high-bleed controllers identified"],
             }
         
         return None
     
-    async def _check_permit_compliance(self, facility: Dict) -> List[Dict]:
+    async def _check_permit_compliance(self, facility: Dict, today: date = None) -> List[Dict]:
         """Check permit-related compliance gaps."""
         
+        today = today or date.today()
         gaps = []
         metadata = facility.get("metadata", {})
         permits = metadata.get("permits", [])
         
-        # Check for expired permits
-        for permit in permits:
-            if permit.get("expiration_date"):
-                exp_date = date.fromisoformat(str(permit.get("expiration_date")))
-                days_until = (exp_date - date.today()).days
-                
-                if days_until < 0:
-                    gaps.append({
-                        "id": f"gap_permit_expired_{permit.get('permit_number', '')[:10]}",
-                        "title": f"Expired Permit: {permit.get('permit_number')}",
-                        "description": f"Permit {permit.get('permit_number')} ({permit.get('permit_type')}) "
-                                      f"expired {abs(days_until)} days ago.",
-                        "severity": "critical",
-                        "status": "open",
-                        "regulation_id": "State permit regulations",
-                        "recommended_action": "Submit renewal application immediately. Contact agency "
-                                             "about operating under expired permit provisions.",
-                        "estimated_cost": 15000,
-                        "timeline_days": 30,
-                        "evidence": [f"Permit expired: {permit.get('expiration_date')}"],
-                        "identified_at": datetime.utcnow().isoformat(),
-                    })
-                elif days_until < 180:
-                    gaps.append({
-                        "id": f"gap_permit_expiring_{permit.get('permit_number', '')[:10]}",
-                        "title": f"Permit Expiring Soon: {permit.get('permit_number')}",
-                        "description": f"Permit {permit.get('permit_number')} expires in {days_until} days. "
-                                      "Most agencies require 6+ months notice for renewal.",
-                        "severity": "high" if days_until < 90 else "medium",
-                        "status": "open",
-                        "regulation_id": "State permit regulations",
-                        "recommended_action": "Initiate permit renewal process. Gather emissions data "
-                                             "and prepare renewal application.",
-                        "estimated_cost": 10000,
-                        "timeline_days": 60,
-                        "evidence": [f"Permit expires: {permit.get('expiration_date')}"],
-                        "identified_at": datetime.utcnow().isoformat(),
-                    })
+        # Check for expired permits; days-until-expiry for every dated permit
+        # is computed in one vectorized pass and only the flagged ones visited
+        dated_permits = [p for p in permits if p.get("expiration_date")]
+        if dated_permits:
+            expirations = np.array(
+                [_to_date(p.get("expiration_date")) for p in dated_permits],
+                dtype="datetime64[D]",
+            )
+            days = (expirations - np.datetime64(today, "D")).astype(int)
+        else:
+            days = np.empty(0, dtype=int)
+        
+        for idx in np.flatnonzero(days < 180):
+            permit = dated_permits[idx]
+            permit_number = permit.get("permit_number")
+            expiration_date = permit.get("expiration_date")
+            days_until = int(days[idx])
+            
+            if days_until < 0:
+                gaps.append({
+                    "id": f"gap_permit_expired_{(permit_number or '')[:10]}",
+                    "title": f"Expired Permit: {permit_number}",
+                    "description": f"Permit {permit_number} ({permit.get('permit_type')}) "
+                                  f"expired {abs(days_until)} days ago.",
+                    "severity": "critical",
+                    "status": "open",
+                    "regulation_id": "State permit regulations",
+                    "recommended_action": "Submit renewal application immediately. Contact agency "
+                                         "about operating under expired permit provisions.",
+                    "estimated_cost": 15000,
+                    "timeline_days": 30,
+                    "evidence": [f"Permit expired: {expiration_date}"],
+                })
+            else:
+                gaps.append({
+                    "id": f"gap_permit_expiring_{(permit_number or '')[:10]}",
+                    "title": f"Permit Expiring Soon: {permit_number}",
+                    "description": f"Permit {permit_number} expires in {days_until} days. "
+                                  "Most agencies require 6+ months notice for renewal.",
+                    "severity": "high" if days_until < 90 else "medium",
+                    "status": "open",
+                    "regulation_id": "State permit regulations",
+                    "recommended_action": "Initiate permit renewal process. Gather emissions data "
+                                         "and prepare renewal application.",
+                    "estimated_cost": 10000,
+                    "timeline_days": 60,
+                    "evidence": [f"Permit expires: {expiration_date}"],
+                })
         
         # Check if Title V required but not present
         if facility.get("title_v_applicable") or facility.get("is_major_source"):
+            # A substring test covers the exact match as well
             has_title_v = any(
-                p.get("permit_type", "").lower() == "title v" or "title v" in p.get("permit_type", "").lower()
+                "title v" in (p.get("permit_type") or "").lower()
                 for p in permits
             )
             
             if not has_title_v:
                 gaps.append({
-                    "id": f"gap_title_v_{facility.get('facility_id')[:8]}",
+                    "id": f"gap_title_v_{(facility.get('facility_id') or '')[:8]}",
                     "title": "Missing Title V Operating Permit",
                     "description": "Facility appears to be a major source but no Title V permit on file. "
                                   "Major sources must obtain Title V permits.",
@@ -505,7 +733,6 @@ If no gap exists (facility is compliant), respond with NULL."""
                     "estimated_cost": 75000,
                     "timeline_days": 365,
                     "evidence": ["Facility classified as major source", "No Title V permit found"],
-                    "identified_at": datetime.utcnow().isoformat(),
                 })
         
         return gaps
@@ -520,36 +747,53 @@ If no gap exists (facility is compliant), respond with NULL."""
         # Placeholder for detailed equipment analysis
         return []
     
-    def _calculate_risk_score(self, gap: Dict) -> float:
+    def _calculate_risk_score(self, gap: Dict, today: date = None) -> float:
         """
         Calculate risk score for a gap (0-1 scale).
         
         Risk = Likelihood of Enforcement × Consequence Severity
         """
-        severity_scores = {
-            "critical": 0.95,
-            "high": 0.75,
-            "medium": 0.50,
-            "low": 0.25,
-        }
+        return self._calculate_risk_scores([gap], today)[0]
+    
+    def _calculate_risk_scores(self, gaps: List[Dict], today: date = None) -> List[float]:
+        """
+        Calculate risk scores for a batch of gaps in one vectorized pass.
         
-        base_score = severity_scores.get(gap.get("severity", "medium"), 0.5)
+        Scores follow _calculate_risk_score: a severity base, bumped for
+        deadline proximity and flagged enforcement risk, capped at 1.0.
+        """
+        if not gaps:
+            return []
+        
+        today = np.datetime64(today or date.today(), "D")
+        
+        scores = np.fromiter(
+            (_SEVERITY_SCORES.get(gap.get("severity") or "medium", 0.5) for gap in gaps),
+            dtype=float,
+            count=len(gaps),
+        )
         
-        # Adjust for deadline proximity
-        deadline = gap.get("regulatory_deadline")
-        if deadline:
+        # Adjust for deadline proximity; unparseable deadlines are ignored
+        deadlines = []
+        for gap in gaps:
+            deadline = gap.get("regulatory_deadline")
             try:
-                days_until = (date.fromisoformat(str(deadline)) - date.today()).days
-                if days_until < 30:
-                    base_score = min(1.0, base_score + 0.2)
-                elif days_until < 90:
-                    base_score = min(1.0, base_score + 0.1)
-            except:
-                pass
+                deadlines.append(_to_date(deadline) if deadline else None)
+            except (TypeError, ValueError):
+                deadlines.append(None)
+        deadlines = np.array(deadlines, dtype="datetime64[D]")
+        
+        days_until = (deadlines - today).astype("timedelta64[D]")
+        has_deadline = ~np.isnat(days_until)
+        days_until = days_until.astype(np.int64)
+        scores += np.where(has_deadline & (days_until < 30), 0.2, 0.0)
+        scores += np.where(has_deadline & (days_until >= 30) & (days_until < 90), 0.1, 0.0)
         
         # Adjust for enforcement risk description
-        enforcement_risk = gap.get("enforcement_risk", "").lower()
-        if "high" in enforcement_risk or "priority" in enforcement_risk:
-            base_score = min(1.0, base_score + 0.1)
+        flagged = np.array([
+            "high" in risk or "priority" in risk
+            for risk in ((gap.get("enforcement_risk") or "").lower() for gap in gaps)
+        ])
+        scores += np.where(flagged, 0.1, 0.0)
         
-        return round(base_score, 2)
+        return np.minimum(scores, 1.0).round(2).tolist()
@@ -4,8 +4,19 @@ Impact Assessor Agent
 Maps regulatory requirements to specific facility operations and equipment.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from string import Template
 from datetime import datetime, date
+from operator import attrgetter
+import asyncio
+import copy
+import hashlib
+import heapq
+import numpy as np
+import orjson
+import re
 from loguru import logger
 
 from .base_agent import BaseAgent, AgentContext
@@ -13,6 +24,320 @@ from core.config import settings
 from core.models import Facility, Regulation, ComplianceRequirement
 
 
+# Major source and reporting thresholds (simplified), in tons per year
+MAJOR_CRITERIA_TPY = 100
+MAJOR_HAP_TPY = 10
+GHG_REPORTING_CO2E_TPY = 25000
+
+# NSPS OOOOa covers sources constructed, modified or reconstructed after
+# September 18, 2015 and on or before December 6, 2022 (OOOOb after)
+OOOOA_START = date(2015, 9, 18)
+OOOOA_END = date(2022, 12, 6)
+
+# Structured output for a regulation impact assessment. Shared by every
+# call so the rendered schema instructions are identical across prompts;
+# regulation_citation is filled in from the regulation after the call.
+_IMPACT_SCHEMA = {
+    "regulation_citation": "citation of the regulation assessed",
+    "affected_equipment": ["list of affected equipment/sources"],
+    "monitoring_requirements": ["new monitoring requirements"],
+    "recordkeeping_changes": ["recordkeeping changes needed"],
+    "capital_requirements": ["capital expenditures needed"],
+    "operational_changes": ["operational changes required"],
+    "estimated_cost": 0,  # USD
+    "compliance_timeline_days": 0,
+    "impact_level": "critical/high/medium/low",
+    "impact_score": 0,  # 0-100
+    "primary_concern": "main compliance challenge",
+    "non_compliance_risk": "description of enforcement risk",
+    "required_actions": [
+        {
+            "description": "action needed",
+            "priority": "critical/high/medium/low",
+            "deadline": "YYYY-MM-DD or None",
+            "estimated_cost": 0,
+            "responsible_party": "who should do this",
+        }
+    ],
+}
+
+# Batched variant: one entry per regulation, keyed by its number in the prompt
+_IMPACT_BATCH_SCHEMA = {
+    "impacts": [{"index": "number of the regulation in the list above", **_IMPACT_SCHEMA}],
+}
+
+# Affirmative applicability answer: "YES", "Yes," or "yes." at the start
+_YES_RE = re.compile(r"^\s*yes\b", re.IGNORECASE)
+
+# Prompt templates, parsed once; only the regulation and facility fields
+# are substituted per call
+_APPLICABILITY_PROMPT = Template("""Determine if this regulation applies to this Oil & Gas facility.
+
+Regulation: $citation - $title
+Regulation Type: $regulation_type
+Applicability Criteria from Regulation:$requirements
+
+Facility Profile:
+$facility_context
+
+Does this regulation apply to this facility? Consider:
+1. Facility type and operations
+2. Emission sources present
+3. Emission thresholds (if specified)
+4. Construction/modification dates
+5. State location
+
+Respond with YES or NO, followed by a brief explanation.""")
+
+_IMPACT_PROMPT = Template("""Assess the compliance impact of this regulation on this facility:
+
+Regulation: $citation - $title
+Key Requirements:$requirements
+Compliance Deadline: $compliance_deadline
+
+Facility: $facility_name
+$facility_context
+
+Analyze:
+1. What specific equipment/sources are affected?
+2. What new monitoring/testing is required?
+3. What recordkeeping changes are needed?
+4. What capital expenditures might be required?
+5. What operational changes are needed?
+6. What is the estimated compliance cost?
+7. What is the timeline to achieve compliance?
+8. What are the risks of non-compliance?""")
+
+_IMPACT_BATCH_ENTRY = Template("""$number. Regulation: $citation - $title
+   Key Requirements:$requirements
+   Compliance Deadline: $compliance_deadline""")
+
+_IMPACT_BATCH_PROMPT = Template("""Assess the compliance impact of each of these regulations on this facility:
+
+$regulation_lines
+
+Facility: $facility_name
+$facility_context
+
+For each regulation, analyze:
+1. What specific equipment/sources are affected?
+2. What new monitoring/testing is required?
+3. What recordkeeping changes are needed?
+4. What capital expenditures might be required?
+5. What operational changes are needed?
+6. What is the estimated compliance cost?
+7. What is the timeline to achieve compliance?
+8. What are the risks of non-compliance?
+
+Return one entry per regulation, numbered as listed.""")
+
+# Relative weight of each regulation impact level in the overall facility
+# score, in tenths so that weighted sums of integer scores stay exact
+_LEVEL_WEIGHTS = {
+    "critical": 10,
+    "high": 7,
+    "medium": 4,
+    "low": 2,
+}
+
+# Impact counts from which the score is computed with numpy
+_VECTORIZE_MIN_IMPACTS = 8
+
+# Sort rank for required action priorities; unknown priorities sort last
+_ACTION_PRIORITY = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+@dataclass(slots=True)
+class RequiredAction:
+    """Typed view of a required action, with its precomputed sort key."""
+    priority: Optional[str]
+    deadline: Optional[str]
+    sort_key: Tuple[int, str]
+    source: Dict[str, Any]
+    
+    @classmethod
+    def from_dict(cls, action: Dict[str, Any]) -> "RequiredAction":
+        priority = action.get("priority")
+        deadline = action.get("deadline")
+        return cls(
+            priority=priority,
+            deadline=deadline,
+            sort_key=(_ACTION_PRIORITY.get(priority, 3), deadline or "9999-99-99"),
+            source=action,
+        )
+
+
+@dataclass(slots=True)
+class ImpactResult:
+    """
+    Typed view of a regulation impact used for per-facility aggregation.
+    
+    The LLM's dict stays the source of truth for output; this only holds
+    the fields that scoring, sorting and cost totals read.
+    """
+    impact_level: str
+    impact_score: Optional[float]
+    estimated_cost: float
+    required_actions: List[RequiredAction] = field(default_factory=list)
+    source: Dict[str, Any] = field(default_factory=dict)
+    
+    @classmethod
+    def from_dict(cls, impact: Dict[str, Any]) -> "ImpactResult":
+        return cls(
+            impact_level=(impact.get("impact_level") or "medium").lower(),
+            impact_score=impact.get("impact_score"),
+            estimated_cost=impact.get("estimated_cost", 0),
+            required_actions=[
+                RequiredAction.from_dict(action)
+                for action in impact.get("required_actions", [])
+                if isinstance(action, dict)
+            ],
+            source=impact,
+        )
+
+
+def _fingerprint(value: Dict) -> str:
+    """Stable content hash of a facility or regulation profile."""
+    payload = orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _potential_emissions(facility: Dict) -> Dict[str, float]:
+    """Potential-to-emit by pollutant from the facility profile."""
+    return facility.get("metadata", {}).get("total_potential_emissions_tpy", {}) or {}
+
+
+def _has_emissions(facility: Dict) -> bool:
+    """Whether the facility profile lists any emission source or nonzero PTE."""
+    if facility.get("metadata", {}).get("emission_sources"):
+        return True
+    return any((tpy or 0) > 0 for tpy in _potential_emissions(facility).values())
+
+
+def _format_requirements(requirements: List[str]) -> str:
+    """Render key requirements as a bulleted list for prompts."""
+    if not requirements:
+        return " Not specified"
+    return "\n- " + "\n- ".join(requirements)
+
+
+def _installation_dates(facility: Dict) -> List[date]:
+    """Parseable installation dates of the facility's emission sources."""
+    dates = []
+    for source in facility.get("metadata", {}).get("emission_sources") or []:
+        value = source.get("installation_date")
+        if isinstance(value, datetime):
+            dates.append(value.date())
+        elif isinstance(value, date):
+            dates.append(value)
+        elif value:
+            try:
+                dates.append(date.fromisoformat(str(value)[:10]))
+            except ValueError:
+                continue
+    return dates
+
+
+def _nsps_ooooa_applies(facility: Dict) -> Optional[bool]:
+    # A source installed in the OOOOa window settles it; otherwise a later
+    # modification may still trigger it, which the profile can't show
+    if any(OOOOA_START < installed <= OOOOA_END for installed in _installation_dates(facility)):
+        return True
+    return None
+
+
+def _neshap_hh_applies(facility: Dict) -> Optional[bool]:
+    if (_potential_emissions(facility).get("HAP") or 0) >= MAJOR_HAP_TPY:
+        return True
+    return None
+
+
+def _ghg_subpart_w_applies(facility: Dict) -> Optional[bool]:
+    co2e = _potential_emissions(facility).get("CO2e")
+    if co2e is None:
+        return None
+    return co2e >= GHG_REPORTING_CO2E_TPY
+
+
+# Regulation types that only apply to facilities that emit something
+EMISSIONS_REGULATION_TYPES = frozenset({"nsps", "neshap", "ghg_reporting"})
+
+
+# Deterministic applicability rules by regulation ID. A rule returns
+# True/False when the facility profile settles the question, or None to
+# defer to the LLM.
+APPLICABILITY_RULES: Dict[str, Callable[[Dict], Optional[bool]]] = {
+    "nsps-ooooa": _nsps_ooooa_applies,
+    "neshap-hh": _neshap_hh_applies,
+    "ghg-subpart-w": _ghg_subpart_w_applies,
+}
+
+
+def _impact_score(impacts: List[ImpactResult]) -> float:
+    """Calculate overall impact score from individual regulation impacts."""
+    if not impacts:
+        return 0.0
+    
+    # Weight by impact level; large batches use float32 arrays, which hold
+    # the integer weights and sums exactly
+    if len(impacts) >= _VECTORIZE_MIN_IMPACTS:
+        count = len(impacts)
+        weights = np.fromiter(
+            (_LEVEL_WEIGHTS.get(impact.impact_level, 4) for impact in impacts),
+            dtype=np.float32,
+            count=count,
+        )
+        scores = np.fromiter(
+            (50 if impact.impact_score is None else impact.impact_score for impact in impacts),
+            dtype=np.float32,
+            count=count,
+        )
+        weighted_sum = float(np.dot(scores, weights))
+        total_weight = float(weights.sum())
+    else:
+        weighted_sum = 0
+        total_weight = 0
+        
+        for impact in impacts:
+            weight = _LEVEL_WEIGHTS.get(impact.impact_level, 4)
+            score = 50 if impact.impact_score is None else impact.impact_score
+            
+            weighted_sum += score * weight
+            total_weight += weight
+    
+    if total_weight == 0:
+        return 0.0
+    
+    return round(weighted_sum / total_weight, 1)
+
+
+def _reduce_assessment(impacts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate a facility's regulation impacts into its assessment totals."""
+    # Read each impact's fields once into typed rows for aggregation
+    rows = [ImpactResult.from_dict(impact) for impact in impacts]
+    
+    # Prioritize actions by their precomputed sort keys
+    actions = [action for row in rows for action in row.required_actions]
+    actions.sort(key=attrgetter("sort_key"))
+    
+    # Identify top issues
+    top_issues = [
+        {
+            "regulation": row.source.get("regulation_citation"),
+            "issue": row.source.get("primary_concern"),
+            "impact_level": row.source.get("impact_level"),
+        }
+        for row in heapq.nlargest(5, rows, key=lambda row: row.impact_score or 0)
+    ]
+    
+    return {
+        "overall_impact_score": _impact_score(rows),
+        "estimated_total_cost": sum(row.estimated_cost for row in rows),
+        "required_actions": [action.source for action in actions],
+        "top_issues": top_issues,
+    }
+
+
 class ImpactAssessorAgent(BaseAgent):
     """
     Agent responsible for assessing the impact of regulations
@@ -26,6 +351,19 @@ class ImpactAssessorAgent(BaseAgent):
     - Prioritize impacts by severity and deadline
     """
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # Facility-type index over the last regulation list seen, keyed on the
+        # list's contents so in-place appends (e.g. AgentContext) rebuild it
+        self._regulation_index: Optional[Tuple[Tuple, Dict[str, List[int]], List[int]]] = None
+        
+        # Prompt-ready key requirements by regulation ID, built with the index
+        self._requirements_text: Dict[str, str] = {}
+        
+        # Regulation impacts keyed by (facility, regulation) content hashes
+        self._impact_cache: OrderedDict[Tuple[str, str], Dict[str, Any]] = OrderedDict()
+    
     @property
     def agent_type(self) -> str:
         return "impact_assessor"
@@ -88,48 +426,125 @@ what they need to do to comply."""
             logger.warning("No facilities provided for impact assessment")
             return {"assessments": [], "summary": "No facilities to assess"}
         
-        if not regulations:
-            logger.info("No specific regulations provided, will assess against all applicable")
-            regulations = await self._get_applicable_regulations()
+        regulations = await self.resolve_regulations(regulations)
+        classifications = self.classify_facilities(facilities)
+        assessment_date = datetime.utcnow().isoformat()
+        
+        # Facilities are independent, so assess them concurrently; LLM calls
+        # are bounded by the agent's request semaphore
+        outcomes = await asyncio.gather(
+            *[
+                self.assess_one(facility, regulations, classification, assessment_date)
+                for facility, classification in zip(facilities, classifications)
+            ],
+            return_exceptions=True,
+        )
         
-        results = {
-            "assessments": [],
-            "high_impact_facilities": [],
-            "total_estimated_cost": 0,
-            "critical_actions": [],
-            "assessment_date": datetime.utcnow().isoformat(),
-        }
+        assessed_facilities = []
+        assessments = []
+        for facility, outcome in zip(facilities, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Impact assessment failed for facility {facility.get('name')}: {outcome}")
+                continue
+            assessed_facilities.append(facility)
+            assessments.append(outcome)
+        
+        return await self.summarize_assessments(
+            assessed_facilities, regulations, assessments, context, assessment_date
+        )
+    
+    async def resolve_regulations(self, regulations: List[Dict] = None) -> List[Dict]:
+        """Return ``regulations``, or all applicable regulations if none are given."""
+        if regulations:
+            return regulations
+        logger.info("No specific regulations provided, will assess against all applicable")
+        return await self._get_applicable_regulations()
+    
+    def classify_facilities(self, facilities: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Classify a portfolio of facilities in one vectorized pass.
         
-        for facility in facilities:
-            logger.info(f"Assessing impact for facility: {facility.get('name')}")
-            
-            assessment = await self._assess_facility(facility, regulations)
-            results["assessments"].append(assessment)
-            
+        The results line up with ``facilities`` and may be passed to
+        ``assess_one`` one by one.
+        """
+        return self._classify_facilities_batch(facilities)
+    
+    async def assess_one(
+        self,
+        facility: Dict,
+        regulations: List[Dict],
+        classification: Dict[str, Any] = None,
+        assessment_date: str = None
+    ) -> Dict[str, Any]:
+        """
+        Assess a single facility against regulations.
+        
+        Facilities are independent of each other, so callers may run
+        several of these concurrently. ``classification`` may be passed
+        from a batch classification and ``assessment_date`` shared across
+        a run; otherwise both are computed here.
+        """
+        logger.info(f"Assessing impact for facility: {facility.get('name')}")
+        return await self._assess_facility(facility, regulations, classification, assessment_date)
+    
+    async def summarize_assessments(
+        self,
+        facilities: List[Dict],
+        regulations: List[Dict],
+        assessments: List[Dict],
+        context: AgentContext = None,
+        assessment_date: str = None,
+    ) -> Dict[str, Any]:
+        """
+        Aggregate per-facility assessments into run results.
+        
+        Args:
+            facilities: Facilities that were assessed
+            regulations: Regulations they were assessed against
+            assessments: Assessments in the same order as facilities
+            context: Shared agent context
+            assessment_date: Run timestamp; defaults to now
+        
+        Returns:
+            Dictionary with impact assessments by facility
+        """
+        pairs = list(zip(facilities, assessments))
+        
+        results = {
+            "assessments": list(assessments),
             # Track high-impact facilities
-            if assessment.get("overall_impact_score", 0) >= 70:
-                results["high_impact_facilities"].append({
+            "high_impact_facilities": [
+                {
                     "facility_id": facility.get("facility_id"),
                     "facility_name": facility.get("name"),
                     "impact_score": assessment.get("overall_impact_score"),
                     "top_issues": assessment.get("top_issues", [])[:3],
-                })
-            
+                }
+                for facility, assessment in pairs
+                if assessment.get("overall_impact_score", 0) >= 70
+            ],
             # Accumulate costs
-            results["total_estimated_cost"] += assessment.get("estimated_total_cost", 0)
-            
+            "total_estimated_cost": sum(a.get("estimated_total_cost", 0) for a in assessments),
             # Collect critical actions
-            for action in assessment.get("required_actions", []):
-                if action.get("priority") == "critical":
-                    results["critical_actions"].append({
-                        "facility": facility.get("name"),
-                        "action": action.get("description"),
-                        "deadline": action.get("deadline"),
-                    })
-            
-            # Add to context if provided
-            if context:
-                context.metadata[f"impact_{facility.get('facility_id')}"] = assessment
+            "critical_actions": [
+                {
+                    "facility": facility.get("name"),
+                    "action": action.get("description"),
+                    "deadline": action.get("deadline"),
+                }
+                for facility, assessment in pairs
+                for action in assessment.get("required_actions", [])
+                if action.get("priority") == "critical"
+            ],
+            "assessment_date": assessment_date or datetime.utcnow().isoformat(),
+        }
+        
+        # Add to context if provided
+        if context:
+            context.metadata.update(
+                (f"impact_{facility.get('facility_id')}", assessment)
+                for facility, assessment in pairs
+            )
         
         # Log decision
         await self.log_decision(
@@ -155,62 +570,40 @@ what they need to do to comply."""
     async def _assess_facility(
         self,
         facility: Dict,
-        regulations: List[Dict]
+        regulations: List[Dict],
+        classification: Dict[str, Any] = None,
+        assessment_date: str = None
     ) -> Dict[str, Any]:
         """Assess a single facility against regulations."""
         
-        # Build facility context for LLM
+        # Build facility context for LLM once; every prompt below reuses it
         facility_context = self._build_facility_context(facility)
+        facility_fingerprint = _fingerprint(facility)
         
         # Determine applicable regulations
-        applicable_regs = await self._determine_applicability(facility, regulations)
-        
-        # Assess impact of each applicable regulation
-        impacts = []
-        total_cost = 0
-        required_actions = []
-        
-        for reg in applicable_regs:
-            impact = await self._assess_regulation_impact(facility, reg)
-            impacts.append(impact)
-            total_cost += impact.get("estimated_cost", 0)
-            required_actions.extend(impact.get("required_actions", []))
-        
-        # Calculate overall impact score
-        impact_score = self._calculate_impact_score(impacts)
-        
-        # Prioritize actions
-        required_actions = sorted(
-            required_actions,
-            key=lambda x: (
-                0 if x.get("priority") == "critical" else
-                1 if x.get("priority") == "high" else
-                2 if x.get("priority") == "medium" else 3,
-                x.get("deadline", "9999-99-99")
+        applicable_regs = await self._determine_applicability(facility, regulations, facility_context)
+        
+        # Assess impact of the applicable regulations in batches, concurrently
+        batch_size = max(1, settings.agent.impact_batch_size)
+        batches = await asyncio.gather(*[
+            self._assess_regulations_batch(
+                facility, applicable_regs[i:i + batch_size], facility_context, facility_fingerprint
             )
-        )
+            for i in range(0, len(applicable_regs), batch_size)
+        ])
+        impacts = [impact for batch in batches for impact in batch]
         
-        # Identify top issues
-        top_issues = [
-            {
-                "regulation": imp.get("regulation_citation"),
-                "issue": imp.get("primary_concern"),
-                "impact_level": imp.get("impact_level"),
-            }
-            for imp in sorted(impacts, key=lambda x: x.get("impact_score", 0), reverse=True)[:5]
-        ]
+        # Score, sort and total the impacts
+        totals = _reduce_assessment(impacts)
         
         return {
             "facility_id": facility.get("facility_id"),
             "facility_name": facility.get("name"),
-            "assessment_date": datetime.utcnow().isoformat(),
+            "assessment_date": assessment_date or datetime.utcnow().isoformat(),
             "applicable_regulations": [r.get("citation") for r in applicable_regs],
             "regulation_impacts": impacts,
-            "overall_impact_score": impact_score,
-            "estimated_total_cost": total_cost,
-            "required_actions": required_actions,
-            "top_issues": top_issues,
-            "facility_classification": await self._classify_facility(facility),
+            **totals,
+            "facility_classification": classification or await self._classify_facility(facility),
         }
     
     def _build_facility_context(self, facility: Dict) -> str:
@@ -252,166 +645,322 @@ what they need to do to comply."""
     async def _determine_applicability(
         self,
         facility: Dict,
-        regulations: List[Dict]
+        regulations: List[Dict],
+        facility_context: str = None
     ) -> List[Dict]:
         """Determine which regulations apply to a facility."""
         
-        applicable = []
         facility_type = facility.get("facility_type", "").lower()
-        is_major = facility.get("is_major_source", False)
         
-        for reg in regulations:
-            # Check facility type match
-            reg_facility_types = [ft.lower() for ft in reg.get("applicable_facility_types", [])]
-            
-            if not reg_facility_types or facility_type in reg_facility_types or "all" in reg_facility_types:
-                # Further analysis with LLM for edge cases
-                if await self._check_detailed_applicability(facility, reg):
-                    applicable.append(reg)
+        # Check facility type match, keeping the regulations' order
+        by_type, unrestricted = self._get_regulation_index(regulations)
+        positions = sorted(set(by_type.get(facility_type, [])).union(unrestricted))
+        candidates = [regulations[i] for i in positions]
+        
+        # Facilities without emission sources or PTE (e.g. planning-stage
+        # sites) cannot trigger emissions-based regulations
+        if not _has_emissions(facility):
+            candidates = [
+                reg for reg in candidates
+                if reg.get("regulation_type") not in EMISSIONS_REGULATION_TYPES
+            ]
+        
+        # Further analysis with LLM for edge cases, all candidates at once
+        checks = await asyncio.gather(*[
+            self._check_detailed_applicability(facility, reg, facility_context) for reg in candidates
+        ])
+        
+        return [reg for reg, applies in zip(candidates, checks) if applies]
+    
+    def _get_regulation_index(
+        self,
+        regulations: List[Dict]
+    ) -> Tuple[Dict[str, List[int]], List[int]]:
+        """
+        Index regulation positions by applicable facility type.
         
-        return applicable
+        Returns positions keyed by lower-cased facility type, plus the
+        positions of regulations with no type restriction or "all". The
+        index is reused across facilities while the list holds the same
+        regulations, and rebuilt when regulations are added or replaced.
+        """
+        key = tuple((id(reg), reg.get("id")) for reg in regulations)
+        if self._regulation_index and self._regulation_index[0] == key:
+            return self._regulation_index[1], self._regulation_index[2]
+        
+        by_type: Dict[str, List[int]] = defaultdict(list)
+        unrestricted: List[int] = []
+        self._requirements_text = {}
+        for position, reg in enumerate(regulations):
+            if reg.get("id"):
+                self._requirements_text[reg["id"]] = _format_requirements(reg.get("key_requirements", []))
+            reg_facility_types = frozenset(ft.lower() for ft in reg.get("applicable_facility_types", []))
+            if not reg_facility_types or "all" in reg_facility_types:
+                unrestricted.append(position)
+                continue
+            for facility_type in reg_facility_types:
+                by_type[facility_type].append(position)
+        
+        self._regulation_index = (key, by_type, unrestricted)
+        return by_type, unrestricted
     
-    async def _check_detailed_applicability(self, facility: Dict, regulation: Dict) -> bool:
-        """Use LLM to check detailed applicability criteria."""
+    def _regulation_requirements(self, regulation: Dict) -> str:
+        """Key requirements of a regulation, pre-joined for prompts."""
+        text = self._requirements_text.get(regulation.get("id"))
+        if text is None:
+            text = _format_requirements(regulation.get("key_requirements", []))
+        return text
+    
+    async def _check_detailed_applicability(
+        self,
+        facility: Dict,
+        regulation: Dict,
+        facility_context: str = None
+    ) -> bool:
+        """
+        Check detailed applicability criteria.
+        
+        Regulations with a rule in APPLICABILITY_RULES are decided from the
+        facility profile; the LLM is only consulted when there is no rule
+        or the rule cannot decide.
+        """
+        rule = APPLICABILITY_RULES.get(regulation.get("id"))
+        if rule:
+            applies = rule(facility)
+            if applies is not None:
+                return applies
+        
+        facility_context = facility_context or self._build_facility_context(facility)
+        
+        prompt = _APPLICABILITY_PROMPT.substitute(
+            citation=regulation.get("citation"),
+            title=regulation.get("title"),
+            regulation_type=regulation.get("regulation_type"),
+            requirements=self._regulation_requirements(regulation),
+            facility_context=facility_context,
+        )
         
-        prompt = f"""Determine if this regulation applies to this Oil & Gas facility.
-
-Regulation: {regulation.get('citation')} - {regulation.get('title')}
-Regulation Type: {regulation.get('regulation_type')}
-Applicability Criteria from Regulation: {regulation.get('key_requirements', [])}
-
-Facility Profile:
-{self._build_facility_context(facility)}
-
-Does this regulation apply to this facility? Consider:
-1. Facility type and operations
-2. Emission sources present
-3. Emission thresholds (if specified)
-4. Construction/modification dates
-5. State location
-
-Respond with YES or NO, followed by a brief explanation."""
-
         response = await self.think(prompt)
-        return response.strip().upper().startswith("YES")
+        return bool(_YES_RE.match(response))
     
     async def _assess_regulation_impact(
         self,
         facility: Dict,
-        regulation: Dict
+        regulation: Dict,
+        facility_context: str = None,
+        facility_fingerprint: str = None
     ) -> Dict[str, Any]:
-        """Assess the impact of a specific regulation on a facility."""
+        """
+        Assess the impact of a specific regulation on a facility.
+        
+        Results are cached by facility and regulation content under the same
+        conditions as LLM responses, so unchanged pairs skip the LLM on re-runs.
+        """
+        cache_key = self._impact_cache_key(facility, regulation, facility_fingerprint)
+        cached = self._get_cached_impact(cache_key)
+        if cached is not None:
+            return cached
+        
+        facility_context = facility_context or self._build_facility_context(facility)
+        citation = regulation.get("citation")
+        
+        prompt = _IMPACT_PROMPT.substitute(
+            citation=citation,
+            title=regulation.get("title"),
+            requirements=self._regulation_requirements(regulation),
+            compliance_deadline=regulation.get("compliance_deadline", "Not specified"),
+            facility_name=facility.get("name"),
+            facility_context=facility_context,
+        )
         
-        prompt = f"""Assess the compliance impact of this regulation on this facility:
-
-Regulation: {regulation.get('citation')} - {regulation.get('title')}
-Key Requirements: {regulation.get('key_requirements', [])}
-Compliance Deadline: {regulation.get('compliance_deadline', 'Not specified')}
-
-Facility: {facility.get('name')}
-{self._build_facility_context(facility)}
-
-Analyze:
-1. What specific equipment/sources are affected?
-2. What new monitoring/testing is required?
-3. What recordkeeping changes are needed?
-4. What capital expenditures might be required?
-5. What operational changes are needed?
-6. What is the estimated compliance cost?
-7. What is the timeline to achieve compliance?
-8. What are the risks of non-compliance?"""
-
         impact = await self.think_structured(
             prompt=prompt,
-            output_schema={
-                "regulation_citation": regulation.get("citation"),
-                "affected_equipment": ["list of affected equipment/sources"],
-                "monitoring_requirements": ["new monitoring requirements"],
-                "recordkeeping_changes": ["recordkeeping changes needed"],
-                "capital_requirements": ["capital expenditures needed"],
-                "operational_changes": ["operational changes required"],
-                "estimated_cost": 0,  # USD
-                "compliance_timeline_days": 0,
-                "impact_level": "critical/high/medium/low",
-                "impact_score": 0,  # 0-100
-                "primary_concern": "main compliance challenge",
-                "non_compliance_risk": "description of enforcement risk",
-                "required_actions": [
-                    {
-                        "description": "action needed",
-                        "priority": "critical/high/medium/low",
-                        "deadline": "YYYY-MM-DD or None",
-                        "estimated_cost": 0,
-                        "responsible_party": "who should do this",
-                    }
-                ],
-            },
+            output_schema=_IMPACT_SCHEMA,
             context={"facility_type": facility.get("facility_type")}
         )
+        impact["regulation_citation"] = citation
         
+        self._cache_impact(cache_key, impact)
         return impact
     
-    def _calculate_impact_score(self, impacts: List[Dict]) -> float:
-        """Calculate overall impact score from individual regulation impacts."""
-        if not impacts:
-            return 0.0
-        
-        # Weight by impact level
-        level_weights = {
-            "critical": 1.0,
-            "high": 0.7,
-            "medium": 0.4,
-            "low": 0.2,
-        }
+    async def _assess_regulations_batch(
+        self,
+        facility: Dict,
+        regulations: List[Dict],
+        facility_context: str = None,
+        facility_fingerprint: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Assess the impact of several regulations on a facility in one LLM call.
         
-        weighted_sum = 0
-        total_weight = 0
+        Cached pairs are served without the LLM. Any regulation the batched
+        response does not cover is assessed on its own.
         
-        for impact in impacts:
-            level = impact.get("impact_level", "medium").lower()
-            weight = level_weights.get(level, 0.4)
-            score = impact.get("impact_score", 50)
-            
-            weighted_sum += score * weight
-            total_weight += weight
+        Returns:
+            Impacts in the same order as regulations
+        """
+        facility_fingerprint = facility_fingerprint or _fingerprint(facility)
+        cache_keys = [
+            self._impact_cache_key(facility, reg, facility_fingerprint) for reg in regulations
+        ]
+        impacts = [self._get_cached_impact(key) for key in cache_keys]
+        pending = [i for i, impact in enumerate(impacts) if impact is None]
         
-        if total_weight == 0:
-            return 0.0
+        if len(pending) == 1:
+            i = pending[0]
+            impacts[i] = await self._assess_regulation_impact(
+                facility, regulations[i], facility_context, facility_fingerprint
+            )
+            return impacts
         
-        return round(weighted_sum / total_weight, 1)
+        if pending:
+            facility_context = facility_context or self._build_facility_context(facility)
+            
+            pending_regs = [regulations[i] for i in pending]
+            regulation_lines = "\n\n".join(
+                _IMPACT_BATCH_ENTRY.substitute(
+                    number=number,
+                    citation=reg.get("citation"),
+                    title=reg.get("title"),
+                    requirements=self._regulation_requirements(reg),
+                    compliance_deadline=reg.get("compliance_deadline", "Not specified"),
+                )
+                for number, reg in enumerate(pending_regs, start=1)
+            )
+            
+            prompt = _IMPACT_BATCH_PROMPT.substitute(
+                regulation_lines=regulation_lines,
+                facility_name=facility.get("name"),
+                facility_context=facility_context,
+            )
+            
+            response = await self.think_structured(
+                prompt=prompt,
+                output_schema=_IMPACT_BATCH_SCHEMA,
+                context={"facility_type": facility.get("facility_type")}
+            )
+            
+            for entry in response.get("impacts") or []:
+                if not isinstance(entry, dict):
+                    continue
+                try:
+                    number = int(entry.pop("index"))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not 1 <= number <= len(pending):
+                    continue
+                i = pending[number - 1]
+                if impacts[i] is None:
+                    entry["regulation_citation"] = pending_regs[number - 1].get("citation")
+                    self._cache_impact(cache_keys[i], entry)
+                    impacts[i] = entry
+            
+            # Assess anything the batched response missed individually
+            missing = [i for i in pending if impacts[i] is None]
+            if missing:
+                retried = await asyncio.gather(*[
+                    self._assess_regulation_impact(
+                        facility, regulations[i], facility_context, facility_fingerprint
+                    )
+                    for i in missing
+                ])
+                for i, impact in zip(missing, retried):
+                    impacts[i] = impact
+        
+        return impacts
+    
+    def _impact_cache_key(
+        self,
+        facility: Dict,
+        regulation: Dict,
+        facility_fingerprint: str = None
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Cache key for a facility/regulation impact, or None when caching is off.
+        
+        Keys are content hashes of both profiles, so the cache reuses one
+        assessment per input pair whatever the model temperature; only
+        LLM_RESPONSE_CACHE_SIZE turns it off.
+        """
+        if settings.llm.response_cache_size <= 0:
+            return None
+        return (facility_fingerprint or _fingerprint(facility), _fingerprint(regulation))
+    
+    def _get_cached_impact(self, cache_key: Optional[Tuple[str, str]]) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached impact, if present."""
+        if cache_key is None:
+            return None
+        cached = self._impact_cache.get(cache_key)
+        if cached is None:
+            return None
+        self._impact_cache.move_to_end(cache_key)
+        return copy.deepcopy(cached)
+    
+    def _cache_impact(self, cache_key: Optional[Tuple[str, str]], impact: Dict[str, Any]):
+        """Store a successfully parsed impact in the LRU cache."""
+        if cache_key is None or "parse_error" in impact:
+            return
+        self._impact_cache[cache_key] = copy.deepcopy(impact)
+        self._impact_cache.move_to_end(cache_key)
+        if len(self._impact_cache) > settings.llm.response_cache_size:
+            self._impact_cache.popitem(last=False)
     
     async def _classify_facility(self, facility: Dict) -> Dict[str, Any]:
         """Classify facility for regulatory purposes."""
+        return self._classify_facilities_batch([facility])[0]
+    
+    def _classify_facilities_batch(self, facilities: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        Classify facilities for regulatory purposes.
         
-        metadata = facility.get("metadata", {})
-        emissions = metadata.get("total_potential_emissions_tpy", {})
+        Potential-to-emit values are gathered into arrays once and the
+        threshold checks run as vectorized comparisons across all facilities.
+        """
+        if not facilities:
+            return []
+        
+        emissions = [_potential_emissions(f) for f in facilities]
+        
+        def pte(pollutant: str) -> np.ndarray:
+            return np.fromiter(
+                (e.get(pollutant) or 0 for e in emissions), dtype=np.float64, count=len(emissions)
+            )
         
         # Determine major source status
         # Major source thresholds (simplified):
         # - 100 tpy for criteria pollutants in attainment areas
         # - 10 tpy for single HAP, 25 tpy for combined HAPs
         
-        voc_pte = emissions.get("VOC", 0)
-        nox_pte = emissions.get("NOx", 0)
-        hap_pte = emissions.get("HAP", 0)
-        
-        is_major_criteria = voc_pte >= 100 or nox_pte >= 100
-        is_major_hap = hap_pte >= 10
+        is_major_criteria = (pte("VOC") >= MAJOR_CRITERIA_TPY) | (pte("NOx") >= MAJOR_CRITERIA_TPY)
+        is_major_hap = pte("HAP") >= MAJOR_HAP_TPY
+        ghg_reporting = pte("CO2e") >= GHG_REPORTING_CO2E_TPY
+        neshap_type = np.array(
+            [f.get("facility_type") in ["processing", "production"] for f in facilities], dtype=bool
+        )
         
-        return {
-            "is_major_source_criteria": is_major_criteria,
-            "is_major_source_hap": is_major_hap,
-            "title_v_required": is_major_criteria or is_major_hap,
-            "nsps_applicable": True,  # Almost always applies to O&G
-            "neshap_applicable": is_major_hap or facility.get("facility_type") in ["processing", "production"],
-            "ghg_reporting_required": emissions.get("CO2e", 0) >= 25000,
-            "pte_summary": {
-                "VOC_tpy": voc_pte,
-                "NOx_tpy": nox_pte,
-                "HAP_tpy": hap_pte,
-                "CO2e_tpy": emissions.get("CO2e", 0),
+        return [
+            {
+                "is_major_source_criteria": major_criteria,
+                "is_major_source_hap": major_hap,
+                "title_v_required": major_criteria or major_hap,
+                "nsps_applicable": True,  # Almost always applies to O&G
+                "neshap_applicable": major_hap or neshap,
+                "ghg_reporting_required": ghg,
+                "pte_summary": {
+                    "VOC_tpy": e.get("VOC", 0),
+                    "NOx_tpy": e.get("NOx", 0),
+                    "HAP_tpy": e.get("HAP", 0),
+                    "CO2e_tpy": e.get("CO2e", 0),
+                }
             }
-        }
+            for e, major_criteria, major_hap, ghg, neshap in zip(
+                emissions,
+                is_major_criteria.tolist(),
+                is_major_hap.tolist(),
+                ghg_reporting.tolist(),
+                neshap_type.tolist(),
+            )
+        ]
     
     async def _get_applicable_regulations(self) -> List[Dict]:
         """Get all potentially applicable regulations for O&G facilities."""
@@ -4,42 +4,28 @@ Regulation Monitor Agent
 Monitors EPA and state regulatory sources for changes relevant to Oil & Gas operations.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
+from enum import Enum
+from string import Template
+from xml.etree import ElementTree
 import asyncio
+import copy
+import time
+import httpx
 from loguru import logger
 
 from .base_agent import BaseAgent, AgentContext
 from core.config import settings
+from core.exceptions import EPAAPIError
 from core.models import (
     Regulation, RegulatoryChange, RegulationType, RegulatoryStatus,
     FacilityType, EmissionSourceType
 )
 
 
-class RegulationMonitorAgent(BaseAgent):
-    """
-    Agent responsible for monitoring regulatory sources and
-    identifying changes relevant to Oil & Gas operations.
-    
-    Capabilities:
-    - Monitor EPA Federal Register for Clean Air Act updates
-    - Track state environmental agency announcements
-    - Classify regulations by Oil & Gas applicability
-    - Extract compliance deadlines and effective dates
-    """
-    
-    @property
-    def agent_type(self) -> str:
-        return "regulation_monitor"
-    
-    @property
-    def description(self) -> str:
-        return "Monitors EPA and state regulations for Oil & Gas compliance changes"
-    
-    @property
-    def system_prompt(self) -> str:
-        return """You are an expert environmental regulatory analyst specializing in 
+_SYSTEM_PROMPT = """You are an expert environmental regulatory analyst specializing in 
 EPA Clean Air Act regulations for the Oil & Gas industry. Your role is to:
 
 1. Analyze regulatory documents and identify key requirements
@@ -62,11 +48,150 @@ When analyzing regulations, always consider:
 
 Provide accurate, actionable analysis that environmental compliance professionals can use."""
 
+# Document fields requested from the Federal Register API
+_FEDERAL_REGISTER_FIELDS = [
+    "document_number", "title", "type", "abstract", "agencies", "cfr_references",
+    "publication_date", "effective_on", "comments_close_on", "html_url", "full_text_xml_url",
+]
+
+# Full-text XML elements whose text is kept: headings and paragraphs
+_FULL_TEXT_TAGS = frozenset({"HD", "P", "FP"})
+_FULL_TEXT_CHUNK_BYTES = 64 * 1024
+
+# Leading full text analyzed in place of a missing abstract
+_ABSTRACT_FULL_TEXT_CHARS = 2000
+
+# Regulation type by CFR part, in precedence order for multi-part documents
+_CFR_PART_TYPES = (
+    (60, RegulationType.NSPS),
+    (63, RegulationType.NESHAP),
+    (98, RegulationType.GHG_REPORTING),
+)
+
+# LLM-reported facility types and emission sources -> model enums
+_FACILITY_TYPE_MAP = {
+    "production": FacilityType.PRODUCTION,
+    "gathering": FacilityType.GATHERING,
+    "processing": FacilityType.PROCESSING,
+    "transmission": FacilityType.TRANSMISSION,
+    "storage": FacilityType.STORAGE,
+}
+
+_SOURCE_TYPE_MAP = {
+    "combustion": EmissionSourceType.COMBUSTION,
+    "fugitive": EmissionSourceType.FUGITIVE,
+    "venting": EmissionSourceType.VENTING,
+    "storage": EmissionSourceType.STORAGE,
+    "loading": EmissionSourceType.LOADING,
+}
+
+_ANALYSIS_SCHEMA = {
+    "is_relevant": "boolean - true if relevant to Oil & Gas",
+    "is_new": "boolean - true if new regulation, false if amendment",
+    "applicable_facility_types": ["list of: production, gathering, processing, transmission, storage"],
+    "applicable_emission_sources": ["list of: combustion, fugitive, venting, storage, loading"],
+    "key_requirements": ["list of key compliance requirements"],
+    "deadlines": ["list of important dates and deadlines"],
+    "summary": "2-3 sentence summary for compliance professionals",
+    "confidence": "0-1 confidence score"
+}
+
+_ANALYSIS_BATCH_SCHEMA = {
+    "analyses": [{"index": "number of the document in the list above", **_ANALYSIS_SCHEMA}],
+}
+
+# Prompt templates, parsed once; only the document fields are substituted
+# per call
+_ANALYSIS_PROMPT = Template("""Analyze this Federal Register document for relevance to Oil & Gas industry compliance:
+
+Title: $title
+Type: $type
+Abstract: $abstract
+CFR References: $cfr_references
+
+Please analyze and respond with:
+1. Is this regulation relevant to Oil & Gas operations? (yes/no)
+2. Is this a new regulation or an amendment to existing regulation?
+3. What types of Oil & Gas facilities does it apply to? (production, gathering, processing, transmission, storage)
+4. What emission sources are affected? (combustion, fugitive, venting, storage, loading)
+5. What are the key compliance requirements?
+6. What are the critical deadlines?
+7. Summary in 2-3 sentences for compliance professionals.""")
+
+_ANALYSIS_BATCH_ENTRY = Template("""$number. Title: $title
+   Type: $type
+   Abstract: $abstract
+   CFR References: $cfr_references""")
+
+_ANALYSIS_BATCH_PROMPT = Template("""Analyze each of these Federal Register documents for relevance to Oil & Gas industry compliance:
+
+$document_lines
+
+For each document, analyze and respond with:
+1. Is this regulation relevant to Oil & Gas operations? (yes/no)
+2. Is this a new regulation or an amendment to existing regulation?
+3. What types of Oil & Gas facilities does it apply to? (production, gathering, processing, transmission, storage)
+4. What emission sources are affected? (combustion, fugitive, venting, storage, loading)
+5. What are the key compliance requirements?
+6. What are the critical deadlines?
+7. Summary in 2-3 sentences for compliance professionals.
+
+Return one entry per document, numbered as listed.""")
+
+
+def _enum_values(values: Any, table: Dict[str, Enum]) -> List[str]:
+    """Enum values for the recognized entries of an LLM-reported list."""
+    if not isinstance(values, list):
+        return []
+    return [table[key].value for key in (str(v).strip().lower() for v in values) if key in table]
+
+
+class RegulationMonitorAgent(BaseAgent):
+    """
+    Agent responsible for monitoring regulatory sources and
+    identifying changes relevant to Oil & Gas operations.
+    
+    Capabilities:
+    - Monitor EPA Federal Register for Clean Air Act updates
+    - Track state environmental agency announcements
+    - Classify regulations by Oil & Gas applicability
+    - Extract compliance deadlines and effective dates
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # Published documents don't change, so analyses are cached by document
+        # number along with the monotonic time they were stored
+        self._analysis_cache: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        
+        # Document numbers a scan has already analyzed and recorded
+        self._seen_docs: Set[str] = set()
+        
+        # Pooled Federal Register API client, created on first live fetch
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_lock = asyncio.Lock()
+    
+    @property
+    def agent_type(self) -> str:
+        return "regulation_monitor"
+    
+    @property
+    def description(self) -> str:
+        return "Monitors EPA and state regulations for Oil & Gas compliance changes"
+    
+    @property
+    def system_prompt(self) -> str:
+        return _SYSTEM_PROMPT
+    
     async def run(
         self,
         context: AgentContext = None,
         lookback_days: int = None,
         specific_citations: List[str] = None,
+        force_refresh: bool = False,
+        skip_seen: bool = False,
+        reprocess_ids: Optional[Set[str]] = None,
     ) -> Dict[str, Any]:
         """
         Run the regulation monitoring process.
@@ -75,12 +200,16 @@ Provide accurate, actionable analysis that environmental compliance professional
             context: Shared agent context
             lookback_days: Days to look back for changes
             specific_citations: Specific CFR citations to check
+            force_refresh: Re-analyze documents even if a cached analysis exists
+            skip_seen: Only process documents no earlier scan has processed
+            reprocess_ids: Document numbers to forget and analyze afresh
             
         Returns:
             Dictionary with found regulations and changes
         """
         lookback_days = lookback_days or settings.epa.lookback_days
-        start_date = date.today() - timedelta(days=lookback_days)
+        today = date.today()
+        start_date = today - timedelta(days=lookback_days)
         
         logger.info(f"Scanning for regulatory changes since {start_date}")
         
@@ -89,15 +218,49 @@ Provide accurate, actionable analysis that environmental compliance professional
             "amended_regulations": [],
             "upcoming_deadlines": [],
             "alerts": [],
-            "scan_date": datetime.utcnow().isoformat(),
+            "scan_date": datetime.utcnow(),
         }
         
-        # Step 1: Fetch recent Federal Register documents
-        fed_reg_docs = await self._fetch_federal_register(start_date)
+        # Step 1: Fetch recent Federal Register documents; the upcoming
+        # deadline check (step 3) is independent, so run it alongside
+        fed_reg_docs, upcoming = await asyncio.gather(
+            self._fetch_federal_register(start_date),
+            self._check_upcoming_deadlines(today),
+        )
+        
+        for document_number in reprocess_ids or ():
+            self._seen_docs.discard(document_number)
+            self._analysis_cache.pop(document_number, None)
+        if skip_seen:
+            fed_reg_docs = [
+                doc for doc in fed_reg_docs
+                if doc.get("document_number") not in self._seen_docs
+            ]
         
-        # Step 2: Analyze each document for Oil & Gas relevance
-        for doc in fed_reg_docs:
-            analysis = await self._analyze_regulation(doc)
+        # Step 2: Analyze the documents for Oil & Gas relevance, several per
+        # LLM call; batches are independent, so run them concurrently
+        batch_size = max(1, settings.agent.analysis_batch_size)
+        batches = await asyncio.gather(
+            *[
+                self._analyze_regulations_batch(fed_reg_docs[i:i + batch_size], force_refresh=force_refresh)
+                for i in range(0, len(fed_reg_docs), batch_size)
+            ],
+            return_exceptions=True,
+        )
+        analyses = []
+        for start, batch in zip(range(0, len(fed_reg_docs), batch_size), batches):
+            if isinstance(batch, Exception):
+                batch = [batch] * len(fed_reg_docs[start:start + batch_size])
+            analyses.extend(batch)
+        
+        for doc, analysis in zip(fed_reg_docs, analyses):
+            if isinstance(analysis, Exception):
+                logger.error(f"Analysis failed for document {doc.get('document_number')}: {analysis}")
+                continue
+            
+            # Only a parsed analysis counts as processed; failures are retried
+            if doc.get("document_number") and "parse_error" not in analysis:
+                self._seen_docs.add(doc["document_number"])
             
             if analysis.get("is_relevant"):
                 regulation = self._create_regulation_record(doc, analysis)
@@ -113,8 +276,8 @@ Provide accurate, actionable analysis that environmental compliance professional
                 
                 # Check for urgent deadlines
                 if regulation.get("compliance_deadline"):
-                    deadline = datetime.fromisoformat(regulation["compliance_deadline"])
-                    days_until = (deadline.date() - date.today()).days
+                    deadline = date.fromisoformat(regulation["compliance_deadline"][:10])
+                    days_until = (deadline - today).days
                     
                     if days_until <= settings.agent.critical_deadline_days:
                         alert = {
@@ -128,8 +291,7 @@ Provide accurate, actionable analysis that environmental compliance professional
                         if context:
                             context.add_alert(alert)
         
-        # Step 3: Check for upcoming deadlines in existing regulations
-        upcoming = await self._check_upcoming_deadlines()
+        # Step 3: Upcoming deadlines in existing regulations
         results["upcoming_deadlines"] = upcoming
         
         # Log decision
@@ -138,7 +300,7 @@ Provide accurate, actionable analysis that environmental compliance professional
             action_taken=f"Scanned Federal Register for {lookback_days} days",
             reasoning=f"Found {len(results['new_regulations'])} new and {len(results['amended_regulations'])} amended regulations",
             confidence=0.9,
-            input_data={"lookback_days": lookback_days, "start_date": start_date.isoformat()},
+            input_data={"lookback_days": lookback_days, "start_date": start_date},
             output_data={
                 "new_count": len(results["new_regulations"]),
                 "amended_count": len(results["amended_regulations"]),
@@ -152,11 +314,11 @@ Provide accurate, actionable analysis that environmental compliance professional
         """
         Fetch recent Federal Register documents related to EPA air regulations.
         
-        In production, this would make actual API calls. For now, we return
-        curated sample data representing real regulations.
+        Queries the Federal Register API when live fetching is enabled;
+        otherwise returns curated sample data representing real regulations.
         """
-        # Simulated Federal Register API response
-        # In production: Use requests to call https://www.federalregister.gov/api/v1/documents
+        if settings.epa.live_federal_register:
+            return await self._fetch_federal_register_live(start_date)
         
         sample_documents = [
             {
@@ -184,79 +346,275 @@ Provide accurate, actionable analysis that environmental compliance professional
             },
         ]
         
-        # Filter by date
+        # Filter by date; ISO dates sort lexically, so compare the date prefix
+        start_iso = start_date.isoformat()
         return [
             doc for doc in sample_documents
-            if datetime.fromisoformat(doc["publication_date"]).date() >= start_date
+            if (doc.get("publication_date") or "")[:10] >= start_iso
         ]
     
-    async def _analyze_regulation(self, document: Dict) -> Dict[str, Any]:
+    async def _fetch_federal_register_live(self, start_date: date) -> List[Dict]:
+        """
+        Page through EPA title 40 documents published since start_date.
+        
+        The first page reports the page count; the remaining pages are
+        fetched concurrently over the pooled client.
+        """
+        client = await self._get_http_client()
+        params = {
+            "conditions[agencies][]": "environmental-protection-agency",
+            "conditions[cfr][title]": 40,
+            "conditions[publication_date][gte]": start_date.isoformat(),
+            "fields[]": _FEDERAL_REGISTER_FIELDS,
+            "per_page": settings.epa.federal_register_page_size,
+            "order": "newest",
+        }
+        
+        async def fetch_page(page: int) -> Dict:
+            try:
+                response = await client.get("/documents.json", params={**params, "page": page})
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise EPAAPIError("documents.json", e.response.status_code, e.response.text[:200])
+            except httpx.HTTPError as e:
+                raise EPAAPIError("documents.json", message=str(e))
+            return response.json()
+        
+        first = await fetch_page(1)
+        rest = await asyncio.gather(
+            *[fetch_page(page) for page in range(2, (first.get("total_pages") or 1) + 1)]
+        )
+        
+        return [doc for page in (first, *rest) for doc in page.get("results") or []]
+    
+    async def fetch_full_text(self, document: Dict, max_chars: int = 5000) -> str:
+        """
+        Stream a document's full-text XML and return its leading text.
+        
+        The XML is parsed incrementally as it downloads, and the download
+        stops once max_chars of heading and paragraph text are collected,
+        so large rules are never held in memory whole.
+        
+        Args:
+            document: Federal Register document with a full_text_xml_url
+            max_chars: Maximum characters of text to return
+        
+        Returns:
+            Headings and paragraphs, one per line
+        """
+        url = document.get("full_text_xml_url")
+        if not url:
+            return ""
+        
+        client = await self._get_http_client()
+        parser = ElementTree.XMLPullParser(events=("end",))
+        parts: List[str] = []
+        length = 0
+        
+        try:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(_FULL_TEXT_CHUNK_BYTES):
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        if elem.tag not in _FULL_TEXT_TAGS:
+                            continue
+                        text = " ".join("".join(elem.itertext()).split())
+                        if text:
+                            parts.append(text)
+                            length += len(text) + 1
+                        elem.clear()
+                    if length >= max_chars:
+                        break
+        except httpx.HTTPStatusError as e:
+            raise EPAAPIError(url, e.response.status_code)
+        except httpx.HTTPError as e:
+            raise EPAAPIError(url, message=str(e))
+        except ElementTree.ParseError as e:
+            logger.warning(f"Malformed full text XML for {document.get('document_number')}: {e}")
+        
+        return "\n".join(parts)[:max_chars]
+    
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled Federal Register client, creating it on first use."""
+        if self._http is None:
+            async with self._http_lock:
+                if self._http is None:
+                    epa_settings = settings.epa
+                    self._http = httpx.AsyncClient(
+                        base_url=epa_settings.federal_register_base_url,
+                        limits=httpx.Limits(max_connections=epa_settings.http_max_connections),
+                        timeout=httpx.Timeout(epa_settings.http_timeout, connect=5.0),
+                    )
+        return self._http
+    
+    async def aclose(self):
+        """Close the pooled Federal Register client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await super().aclose()
+    
+    async def _analyze_regulation(self, document: Dict, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Use LLM to analyze a Federal Register document for Oil & Gas relevance.
+        
+        Analyses are cached by document number; ``force_refresh`` skips the
+        cached analysis and replaces it.
         """
-        prompt = f"""Analyze this Federal Register document for relevance to Oil & Gas industry compliance:
-
-Title: {document.get('title')}
-Type: {document.get('type')}
-Abstract: {document.get('abstract')}
-CFR References: {document.get('cfr_references')}
-
-Please analyze and respond with:
-1. Is this regulation relevant to Oil & Gas operations? (yes/no)
-2. Is this a new regulation or an amendment to existing regulation?
-3. What types of Oil & Gas facilities does it apply to? (production, gathering, processing, transmission, storage)
-4. What emission sources are affected? (combustion, fugitive, venting, storage, loading)
-5. What are the key compliance requirements?
-6. What are the critical deadlines?
-7. Summary in 2-3 sentences for compliance professionals."""
-
+        document_number = document.get("document_number")
+        if not force_refresh:
+            cached = self._get_cached_analysis(document_number)
+            if cached is not None:
+                return cached
+        
+        prompt = _ANALYSIS_PROMPT.substitute(
+            title=document.get("title"),
+            type=document.get("type"),
+            abstract=document.get("abstract"),
+            cfr_references=document.get("cfr_references"),
+        )
+        
         analysis = await self.think_structured(
             prompt=prompt,
-            output_schema={
-                "is_relevant": "boolean - true if relevant to Oil & Gas",
-                "is_new": "boolean - true if new regulation, false if amendment",
-                "applicable_facility_types": ["list of: production, gathering, processing, transmission, storage"],
-                "applicable_emission_sources": ["list of: combustion, fugitive, venting, storage, loading"],
-                "key_requirements": ["list of key compliance requirements"],
-                "deadlines": ["list of important dates and deadlines"],
-                "summary": "2-3 sentence summary for compliance professionals",
-                "confidence": "0-1 confidence score"
-            },
+            output_schema=_ANALYSIS_SCHEMA,
             context={"oil_gas_keywords": settings.epa.oil_gas_keywords}
         )
         
+        self._cache_analysis(document_number, analysis)
         return analysis
     
-    def _create_regulation_record(self, document: Dict, analysis: Dict) -> Dict:
-        """Create a regulation record from Federal Register document and analysis."""
+    async def _analyze_regulations_batch(
+        self,
+        documents: List[Dict],
+        force_refresh: bool = False
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Analyze several Federal Register documents in one LLM call.
         
-        # Map facility types
-        facility_type_map = {
-            "production": FacilityType.PRODUCTION,
-            "gathering": FacilityType.GATHERING,
-            "processing": FacilityType.PROCESSING,
-            "transmission": FacilityType.TRANSMISSION,
-            "storage": FacilityType.STORAGE,
-        }
+        Cached documents are served without the LLM. Any document the batched
+        response does not cover is analyzed on its own.
         
-        # Map emission sources
-        source_type_map = {
-            "combustion": EmissionSourceType.COMBUSTION,
-            "fugitive": EmissionSourceType.FUGITIVE,
-            "venting": EmissionSourceType.VENTING,
-            "storage": EmissionSourceType.STORAGE,
-            "loading": EmissionSourceType.LOADING,
-        }
+        Returns:
+            Analyses in the same order as documents; a document whose
+            individual analysis failed gets the exception instead
+        """
+        analyses: List[Any] = [
+            None if force_refresh else self._get_cached_analysis(doc.get("document_number"))
+            for doc in documents
+        ]
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        await self._fill_missing_abstracts([documents[i] for i in pending])
+        
+        if len(pending) > 1:
+            pending_docs = [documents[i] for i in pending]
+            document_lines = "\n\n".join(
+                _ANALYSIS_BATCH_ENTRY.substitute(
+                    number=number,
+                    title=doc.get("title"),
+                    type=doc.get("type"),
+                    abstract=doc.get("abstract"),
+                    cfr_references=doc.get("cfr_references"),
+                )
+                for number, doc in enumerate(pending_docs, start=1)
+            )
+            
+            response = await self.think_structured(
+                prompt=_ANALYSIS_BATCH_PROMPT.substitute(document_lines=document_lines),
+                output_schema=_ANALYSIS_BATCH_SCHEMA,
+                context={"oil_gas_keywords": settings.epa.oil_gas_keywords}
+            )
+            
+            for entry in response.get("analyses") or []:
+                if not isinstance(entry, dict):
+                    continue
+                try:
+                    number = int(entry.pop("index"))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not 1 <= number <= len(pending):
+                    continue
+                i = pending[number - 1]
+                if analyses[i] is None:
+                    self._cache_analysis(pending_docs[number - 1].get("document_number"), entry)
+                    analyses[i] = entry
+        
+        # Analyze anything the batched response missed individually
+        missing = [i for i in pending if analyses[i] is None]
+        if missing:
+            retried = await asyncio.gather(
+                *[self._analyze_regulation(documents[i], force_refresh=force_refresh) for i in missing],
+                return_exceptions=True,
+            )
+            for i, analysis in zip(missing, retried):
+                analyses[i] = analysis
+        
+        return analyses
+    
+    async def _fill_missing_abstracts(self, documents: List[Dict]):
+        """
+        Use the leading full text as the abstract of live documents without one.
+        
+        Some notices are published without an abstract, which would leave
+        the analysis only the title. A document whose full text cannot be
+        fetched is analyzed as it is.
+        """
+        if not settings.epa.live_federal_register:
+            return
+        missing = [
+            doc for doc in documents
+            if not doc.get("abstract") and doc.get("full_text_xml_url")
+        ]
+        texts = await asyncio.gather(
+            *[self.fetch_full_text(doc, _ABSTRACT_FULL_TEXT_CHARS) for doc in missing],
+            return_exceptions=True,
+        )
+        for doc, text in zip(missing, texts):
+            if isinstance(text, Exception):
+                logger.warning(f"Full text unavailable for {doc.get('document_number')}: {text}")
+            elif text:
+                doc["abstract"] = text
+    
+    def _get_cached_analysis(self, document_number: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached analysis that has not expired, if present."""
+        if not document_number:
+            return None
+        cached = self._analysis_cache.get(document_number)
+        if cached is None:
+            return None
+        stored_at, analysis = cached
+        if time.monotonic() - stored_at > settings.epa.analysis_cache_ttl:
+            del self._analysis_cache[document_number]
+            return None
+        self._analysis_cache.move_to_end(document_number)
+        return copy.deepcopy(analysis)
+    
+    def _cache_analysis(self, document_number: Optional[str], analysis: Dict[str, Any]):
+        """
+        Store a successfully parsed analysis in the LRU cache.
+        
+        Published documents are immutable, so unlike the raw response cache
+        this is not tied to the model temperature; only the size and TTL apply.
+        """
+        if not document_number or "parse_error" in analysis:
+            return
+        if settings.llm.response_cache_size <= 0 or settings.epa.analysis_cache_ttl <= 0:
+            return
+        self._analysis_cache[document_number] = (time.monotonic(), copy.deepcopy(analysis))
+        self._analysis_cache.move_to_end(document_number)
+        if len(self._analysis_cache) > settings.llm.response_cache_size:
+            self._analysis_cache.popitem(last=False)
+    
+    def _create_regulation_record(self, document: Dict, analysis: Dict) -> Dict:
+        """Create a regulation record from Federal Register document and analysis."""
         
         # Determine regulation type from CFR reference
         cfr_refs = document.get("cfr_references", [])
-        reg_type = RegulationType.OTHER
-        if any(ref.get("part") == 60 for ref in cfr_refs):
-            reg_type = RegulationType.NSPS
-        elif any(ref.get("part") == 63 for ref in cfr_refs):
-            reg_type = RegulationType.NESHAP
-        elif any(ref.get("part") == 98 for ref in cfr_refs):
-            reg_type = RegulationType.GHG_REPORTING
+        parts = {ref.get("part") for ref in cfr_refs}
+        reg_type = next(
+            (part_type for part, part_type in _CFR_PART_TYPES if part in parts),
+            RegulationType.OTHER,
+        )
         
         # Determine status
         doc_type = document.get("type", "").lower()
@@ -284,30 +642,35 @@ Please analyze and respond with:
             "publication_date": document.get("publication_date"),
             "effective_date": document.get("effective_on"),
             "compliance_deadline": document.get("effective_on"),  # Simplified
-            "applicable_facility_types": analysis.get("applicable_facility_types", []),
-            "applicable_emission_sources": analysis.get("applicable_emission_sources", []),
+            "applicable_facility_types": _enum_values(
+                analysis.get("applicable_facility_types"), _FACILITY_TYPE_MAP
+            ),
+            "applicable_emission_sources": _enum_values(
+                analysis.get("applicable_emission_sources"), _SOURCE_TYPE_MAP
+            ),
             "key_requirements": analysis.get("key_requirements", []),
             "source_url": document.get("html_url"),
             "analysis_confidence": analysis.get("confidence", 0.8),
         }
     
-    async def _check_upcoming_deadlines(self) -> List[Dict]:
+    async def _check_upcoming_deadlines(self, today: date = None) -> List[Dict]:
         """Check for upcoming compliance deadlines in stored regulations."""
         # In production, this would query the database/Weaviate
         # For now, return sample upcoming deadlines
+        today = today or date.today()
         
         return [
             {
                 "regulation": "40 CFR 60 Subpart OOOOb",
                 "requirement": "Initial LDAR survey for affected facilities",
-                "deadline": (date.today() + timedelta(days=45)).isoformat(),
+                "deadline": (today + timedelta(days=45)).isoformat(),
                 "days_until": 45,
                 "applies_to": ["production", "gathering"],
             },
             {
                 "regulation": "40 CFR 98 Subpart W",
                 "requirement": "Annual GHG emissions report submission",
-                "deadline": (date.today() + timedelta(days=90)).isoformat(),
+                "deadline": (today + timedelta(days=90)).isoformat(),
                 "days_until": 90,
                 "applies_to": ["all facilities > 25,000 MT CO2e"],
             },
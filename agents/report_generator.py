@@ -7,7 +7,10 @@ Produces submission-ready compliance documents and internal reports.
 from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 from pathlib import Path
+from collections import Counter
+import asyncio
 import json
+import orjson
 from loguru import logger
 
 from .base_agent import BaseAgent, AgentContext
@@ -374,11 +377,11 @@ Baseline assessment - trend tracking will begin with subsequent reviews.
         for facility in (facilities or []):
             fac_id = facility.get("facility_id", "")
             fac_gaps = gaps_by_facility.get(fac_id, [])
-            critical_count = len([g for g in fac_gaps if g.get("severity") == "critical"])
+            severity_counts = Counter(g.get("severity") for g in fac_gaps)
+            critical_count = severity_counts["critical"]
             
             # Calculate facility score
-            fac_score = max(0, 100 - (critical_count * 15) - 
-                          (len([g for g in fac_gaps if g.get("severity") == "high"]) * 8))
+            fac_score = max(0, 100 - (critical_count * 15) - (severity_counts["high"] * 8))
             
             lines.append(
                 f"| {facility.get('name', 'Unknown')} | "
@@ -637,8 +640,14 @@ Use formal regulatory language appropriate for EPA submission."""
         
         file_path = output_dir / filename
         
-        with open(file_path, "w") as f:
-            json.dump(report, f, indent=2, default=str)
+        # Disk writes run in a worker thread so concurrent report generation
+        # and other phases keep making progress on the event loop
+        content = orjson.dumps(
+            report,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+        await asyncio.to_thread(file_path.write_bytes, content)
         
         logger.info(f"Saved report to {file_path}")
         
@@ -667,7 +676,6 @@ Use formal regulatory language appropriate for EPA submission."""
             lines.append(section.get("content", ""))
             lines.append("\n")
         
-        with open(path, "w") as f:
-            f.write("\n".join(lines))
+        await asyncio.to_thread(path.write_text, "\n".join(lines))
         
         logger.info(f"Saved markdown report to {path}")
@@ -400,10 +400,11 @@ async def get_dashboard():
         
         # Calculate compliance score
         gaps = crew.context.gaps
-        critical = len([g for g in gaps if g.get("severity") == "critical"])
-        high = len([g for g in gaps if g.get("severity") == "high"])
-        medium = len([g for g in gaps if g.get("severity") == "medium"])
-        low = len([g for g in gaps if g.get("severity") == "low"])
+        severity_counts = crew.context.get_severity_counts()
+        critical = severity_counts.get("critical", 0)
+        high = severity_counts.get("high", 0)
+        medium = severity_counts.get("medium", 0)
+        low = severity_counts.get("low", 0)
         
         score = max(0, 100 - (critical * 15) - (high * 8) - (medium * 3) - (low * 1))
         
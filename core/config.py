@@ -25,6 +25,19 @@ class LLMSettings(BaseSettings):
     # Rate limiting
     max_tokens: int = Field(default=4096, description="Max tokens per request")
     requests_per_minute: int = Field(default=20, description="Rate limit")
+    max_concurrent_requests: int = Field(default=8, description="Max in-flight LLM requests per agent")
+    
+    # Response caching. The raw prompt -> response cache only serves
+    # temperature 0 models unless cache_nondeterministic is set, so with the
+    # default temperature (0.1) it is opt-in. Agent result caches keyed on
+    # their inputs (impacts, document analyses) only honour the size.
+    response_cache_size: int = Field(default=512, description="Max cached LLM responses/results per agent (0 disables)")
+    cache_nondeterministic: bool = Field(default=False, description="Cache raw responses even when temperature > 0")
+    
+    # Shared HTTP connection pool
+    http_max_connections: int = Field(default=64, description="Max open connections to the LLM API")
+    http_max_keepalive: int = Field(default=32, description="Max idle keep-alive connections")
+    http_timeout: float = Field(default=60.0, description="LLM request timeout in seconds")
     
     class Config:
         env_prefix = "LLM_"
@@ -79,9 +92,16 @@ class EPASettings(BaseSettings):
     # API Keys (optional, for higher rate limits)
     epa_api_key: Optional[str] = Field(default=None, alias="EPA_API_KEY")
     
+    # Federal Register client
+    live_federal_register: bool = Field(default=False, description="Fetch documents from the Federal Register API instead of samples")
+    federal_register_page_size: int = Field(default=1000, description="Documents requested per Federal Register API page")
+    http_max_connections: int = Field(default=10, description="Max open connections to the Federal Register API")
+    http_timeout: float = Field(default=30.0, description="Federal Register request timeout in seconds")
+    
     # Monitoring settings
     check_interval_hours: int = Field(default=24, description="Hours between regulation checks")
     lookback_days: int = Field(default=30, description="Days to look back for changes")
+    analysis_cache_ttl: float = Field(default=604800.0, description="Seconds to reuse a document's LLM analysis")
     
     # Oil & Gas specific CFR parts to monitor
     monitored_cfr_parts: List[str] = Field(default=[
@@ -160,9 +180,16 @@ class AgentSettings(BaseSettings):
     # Execution settings
     max_iterations: int = Field(default=10, description="Max iterations per agent task")
     verbose: bool = Field(default=True, description="Verbose agent output")
+    max_concurrency: int = Field(default=8, description="Max facilities processed concurrently per phase")
+    health_check_ttl: float = Field(default=30.0, description="Seconds to reuse an agent health check result")
+    impact_batch_size: int = Field(default=4, description="Regulations assessed per LLM call (1 disables batching)")
+    analysis_batch_size: int = Field(default=8, description="Federal Register documents analyzed per LLM call (1 disables batching)")
     
     # Memory settings
     memory_window: int = Field(default=50, description="Number of recent decisions to remember")
+    decision_history_size: int = Field(default=1000, description="Decisions kept in-process per agent")
+    decision_flush_batch: int = Field(default=32, description="Max decisions written to memory per batch")
+    decision_flush_interval: float = Field(default=1.0, description="Max seconds to wait while filling a batch")
     
     # Thresholds
     critical_risk_threshold: float = Field(default=0.8, description="Risk score for critical classification")
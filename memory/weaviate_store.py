@@ -11,7 +11,9 @@ from weaviate.classes.config import Configure, Property, DataType
 from weaviate.classes.query import MetadataQuery, Filter
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
 import json
+import orjson
 from loguru import logger
 
 from core.config import settings
@@ -503,29 +505,52 @@ class WeaviateStore:
         try:
             collection = self.client.collections.get(self.settings.agent_memory_collection)
             
-            data = {
-                "decision_id": decision.id,
-                "agent_id": decision.agent_id,
-                "agent_type": decision.agent_type,
-                "decision_type": decision.decision_type,
-                "action_taken": decision.action_taken,
-                "reasoning": decision.reasoning,
-                "confidence": decision.confidence,
-                "timestamp": decision.timestamp.isoformat(),
-                "context": json.dumps({
-                    "input_data": decision.input_data,
-                    "output_data": decision.output_data,
-                    "facility_ids": decision.facility_ids,
-                    "regulation_ids": decision.regulation_ids,
-                }),
-            }
-            
-            uuid = collection.data.insert(data)
+            uuid = collection.data.insert(self._decision_properties(decision))
             return str(uuid)
             
         except Exception as e:
             raise WeaviateError("store_agent_decision", str(e))
     
+    async def store_agent_decisions_batch(self, decisions: List[AgentDecision]) -> List[str]:
+        """Store several agent decisions in a single insert request."""
+        try:
+            collection = self.client.collections.get(self.settings.agent_memory_collection)
+            
+            response = await asyncio.to_thread(
+                collection.data.insert_many,
+                [self._decision_properties(decision) for decision in decisions],
+            )
+            if response.has_errors:
+                logger.warning(f"Failed to store {len(response.errors)} agent decisions")
+            
+            return [str(uuid) for uuid in response.uuids.values()]
+        
+        except Exception as e:
+            raise WeaviateError("store_agent_decisions_batch", str(e))
+    
+    def _decision_properties(self, decision: AgentDecision) -> Dict[str, Any]:
+        """Convert an agent decision into AgentMemory properties."""
+        return {
+            "decision_id": decision.id,
+            "agent_id": decision.agent_id,
+            "agent_type": decision.agent_type,
+            "decision_type": decision.decision_type,
+            "action_taken": decision.action_taken,
+            "reasoning": decision.reasoning,
+            "confidence": decision.confidence,
+            "timestamp": decision.timestamp.isoformat(),
+            "context": orjson.dumps(
+                {
+                    "input_data": decision.input_data,
+                    "output_data": decision.output_data,
+                    "facility_ids": decision.facility_ids,
+                    "regulation_ids": decision.regulation_ids,
+                },
+                option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                default=str,
+            ).decode(),
+        }
+    
     async def get_similar_decisions(
         self,
         context: str,
@@ -534,31 +559,44 @@ class WeaviateStore:
     ) -> List[Dict]:
         """Find similar past decisions for learning."""
         try:
-            collection = self.client.collections.get(self.settings.agent_memory_collection)
-            
-            filter_obj = None
-            if agent_type:
-                filter_obj = Filter.by_property("agent_type").equal(agent_type)
-            
-            response = collection.query.near_text(
-                query=context,
-                limit=limit,
-                filters=filter_obj,
-                return_metadata=MetadataQuery(distance=True),
-            )
-            
-            results = []
-            for obj in response.objects:
-                result = obj.properties.copy()
-                result["_distance"] = obj.metadata.distance
-                if result.get("context"):
-                    result["context"] = json.loads(result["context"])
-                results.append(result)
-            
-            return results
-            
+            return self._query_similar_decisions(context, agent_type, limit)
         except Exception as e:
             raise WeaviateError("get_similar_decisions", str(e))
+    
+    def _query_similar_decisions(
+        self,
+        context: str,
+        agent_type: str = None,
+        limit: int = 5
+    ) -> List[Dict]:
+        """Run a single near-text search over agent memory."""
+        collection = self.client.collections.get(self.settings.agent_memory_collection)
+        
+        filter_obj = None
+        if agent_type:
+            filter_obj = Filter.by_property("agent_type").equal(agent_type)
+        
+        response = collection.query.near_text(
+            query=context,
+            limit=limit,
+            filters=filter_obj,
+            return_metadata=MetadataQuery(distance=True),
+        )
+        
+        results = []
+        for obj in response.objects:
+            result = self._decision_result(obj)
+            result["_distance"] = obj.metadata.distance
+            results.append(result)
+        
+        return results
+    
+    def _decision_result(self, obj) -> Dict:
+        """Convert an AgentMemory object into a decision dict."""
+        result = obj.properties.copy()
+        if result.get("context"):
+            result["context"] = orjson.loads(result["context"])
+        return result
 
 
 # Singleton instance
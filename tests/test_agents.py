@@ -4,6 +4,7 @@ Agent Tests
 Unit tests for EnviroComply agents.
 """
 
+import asyncio
 import pytest
 from datetime import date, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -160,6 +161,7 @@ class TestAgentContext:
         assert summary["facilities_count"] == 1
         assert summary["gaps_count"] == 1
         assert summary["critical_gaps"] == 1
+        assert context.get_severity_counts() == {"critical": 1}
 
 
 @pytest.mark.asyncio
@@ -181,6 +183,262 @@ class TestGapAnalyzer:
         low_gap = {"severity": "low"}
         score = agent._calculate_risk_score(low_gap)
         assert score <= 0.3
+    
+    async def test_permit_expiration_buckets(self):
+        """Test expired and expiring permits are flagged by days remaining."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        facility = {
+            "facility_id": "test-facility",
+            "metadata": {
+                "permits": [
+                    {"permit_number": "EXPIRED", "expiration_date": "2024-05-01"},
+                    {"permit_number": "SOON", "expiration_date": date(2024, 7, 1)},
+                    {"permit_number": "LATER", "expiration_date": "2024-10-01"},
+                    {"permit_number": "CURRENT", "expiration_date": "2026-01-01"},
+                    {"permit_number": "UNDATED"},
+                ]
+            },
+        }
+        
+        gaps = await agent._check_permit_compliance(facility, today=date(2024, 6, 1))
+        
+        assert [g["severity"] for g in gaps] == ["critical", "high", "medium"]
+        assert "expired 31 days ago" in gaps[0]["description"]
+    
+    async def test_impacts_share_one_llm_call(self):
+        """Test all high impacts for a facility are evaluated in one request."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content=(
+            '{"gaps": [{"index": 2, "has_gap": true, "title": "Second", "severity": "high"},'
+            ' {"index": 1, "has_gap": false}]}'
+        )))
+        facility = {"facility_id": "test-facility", "name": "Test Facility"}
+        impacts = [
+            {"regulation_citation": "40 CFR 60.5397a", "impact_level": "critical"},
+            {"regulation_citation": "40 CFR 60.5395a", "impact_level": "high"},
+        ]
+        
+        gaps = await agent._create_gaps_from_impacts(facility, impacts)
+        
+        agent.llm.ainvoke.assert_awaited_once()
+        assert [(g["title"], g["regulation_id"]) for g in gaps] == [("Second", "40 CFR 60.5395a")]
+    
+    async def test_gap_ids_use_run_prefix(self):
+        """Test LLM-derived gap IDs carry the prefix of the run that created them."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content=(
+            '{"gaps": [{"index": 1, "has_gap": true, "title": "First", "severity": "high"}]}'
+        )))
+        facility = {"facility_id": "test-facility", "name": "Test Facility"}
+        impacts = [{"regulation_citation": "40 CFR 60.5397a", "impact_level": "critical"}]
+        
+        first = await agent._create_gaps_from_impacts(facility, impacts, "20240101000000")
+        second = await agent._create_gaps_from_impacts(facility, impacts, "20240102000000")
+        
+        assert first[0]["id"].startswith("gap_20240101000000_")
+        assert second[0]["id"].startswith("gap_20240102000000_")
+    
+    async def test_standard_requirement_checks(self):
+        """Test LDAR, storage and pneumatic checks over emission sources."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        facility = {
+            "facility_id": "test-facility",
+            "metadata": {
+                "emission_sources": [
+                    {"source_type": "fugitive", "last_inspection": "2024-01-01"},
+                    {"source_type": "fugitive", "last_inspection": date(2024, 5, 1)},
+                    {"source_type": "fugitive"},
+                    {"source_type": "storage", "controlled": True},
+                    {"source_type": "storage"},
+                    {"source_type": "storage"},
+                    {"equipment_type": "Pneumatic Controller", "bleed_rate": 8},
+                    {"equipment_type": "Low-bleed pneumatic", "bleed_rate": 2},
+                ]
+            },
+        }
+        
+        gaps = await agent._check_standard_requirements(facility, today=date(2024, 6, 1))
+        gaps_by_title = {g["title"]: g for g in gaps}
+        
+        assert gaps_by_title["LDAR Survey Overdue"]["evidence"][0] == "Last survey: 2024-01-01"
+        assert gaps_by_title["Uncontrolled Storage Vessels"]["estimated_cost"] == 100000
+        assert gaps_by_title["High-Bleed Pneumatic Controllers"]["estimated_cost"] == 2500
+    
+    async def test_standard_checks_ignore_unused_source_fields(self):
+        """Test odd dates or rates on sources a check doesn't cover are ignored."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        facility = {
+            "facility_id": "test-facility",
+            "metadata": {
+                "emission_sources": [
+                    {"source_type": "combustion", "last_inspection": "unknown", "bleed_rate": "n/a"},
+                    {"source_type": "fugitive", "last_inspection": "2024-01-01"},
+                ]
+            },
+        }
+        
+        gaps = await agent._check_standard_requirements(facility, today=date(2024, 6, 1))
+        
+        assert [g["title"] for g in gaps] == ["LDAR Survey Overdue"]
+
+    async def test_standard_checks_without_facility_id(self):
+        """Test gap IDs are still built for a facility record missing its ID."""
+        from agents.gap_analyzer import GapAnalyzerAgent
+        
+        agent = GapAnalyzerAgent()
+        facility = {
+            "facility_id": None,
+            "metadata": {
+                "emission_sources": [
+                    {"source_type": "storage"},
+                    {"equipment_type": "Pneumatic Controller", "bleed_rate": 8},
+                ]
+            },
+        }
+        
+        gaps = await agent._check_standard_requirements(facility, today=date(2024, 6, 1))
+        
+        assert sorted(g["id"] for g in gaps) == ["gap_pneumatic_", "gap_storage_"]
+
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    """Test BaseAgent LLM response caching."""
+    
+    async def test_repeated_prompt_hits_cache(self):
+        """Test identical prompts skip the LLM round-trip."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="OK"))
+        
+        assert await agent.think("Respond with 'OK'") == "OK"
+        assert await agent.think("Respond with 'OK'") == "OK"
+        assert agent.llm.ainvoke.await_count == 1
+    
+    async def test_nonzero_temperature_bypasses_cache(self):
+        """Test sampled responses are not cached by default."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(temperature=0.7)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="OK"))
+        
+        await agent.think("Respond with 'OK'")
+        await agent.think("Respond with 'OK'")
+        assert agent.llm.ainvoke.await_count == 2
+    
+    async def test_structured_response_strips_code_fence(self):
+        """Test fenced JSON responses are parsed."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(
+            return_value=MagicMock(content='```json\n{"is_relevant": true}\n```')
+        )
+        
+        result = await agent.think_structured("Is this relevant?", {"is_relevant": "boolean"})
+        assert result == {"is_relevant": True}
+        system_message = agent.llm.ainvoke.await_args.args[0][0]
+        assert "is_relevant" in system_message.content
+
+    async def test_ping_requires_successful_response(self):
+        """Test ping uses the LLM's pooled client and treats errors as down."""
+        import httpx
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        statuses = iter([200, 503])
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(next(statuses))),
+        )
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(openai_api_base=None, http_async_client=client)
+        
+        with patch.object(settings.llm, "provider", "openai"):
+            assert await agent.ping() is True
+            assert await agent.ping() is False
+        await client.aclose()
+        
+        assert agent._ping_http is None
+    
+    async def test_aclose_releases_ping_client(self):
+        """Test the agent's own ping client is closed with the agent."""
+        import httpx
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(spec=[])
+        client = agent._ping_http = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+        )
+        
+        with patch.object(settings.llm, "provider", "ollama"):
+            assert await agent.ping() is True
+        await agent.aclose()
+        
+        assert client.is_closed
+        assert agent._ping_http is None
+
+
+@pytest.mark.asyncio
+class TestDecisionLogging:
+    """Test BaseAgent decision logging."""
+    
+    async def test_decisions_flushed_in_batch(self):
+        """Test logged decisions are written to memory in one batch."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        memory_store = MagicMock()
+        memory_store.store_agent_decisions_batch = AsyncMock(return_value=[])
+        agent = RegulationMonitorAgent(memory_store=memory_store)
+        
+        for i in range(3):
+            await agent.log_decision(
+                decision_type="test",
+                action_taken=f"action {i}",
+                reasoning="testing",
+                confidence=0.9,
+            )
+        await agent.flush_decisions()
+        
+        memory_store.store_agent_decisions_batch.assert_awaited_once()
+        assert len(memory_store.store_agent_decisions_batch.await_args.args[0]) == 3
+        assert len(agent.decision_history) == 3
+    
+    async def test_queued_decisions_survive_flush_task_restart(self):
+        """Test decisions queued before a flush task ended are still written."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        memory_store = MagicMock()
+        memory_store.store_agent_decisions_batch = AsyncMock(return_value=[])
+        agent = RegulationMonitorAgent(memory_store=memory_store)
+        
+        await agent.log_decision(decision_type="test", action_taken="first", reasoning="r", confidence=0.9)
+        agent._flush_task.cancel()
+        await asyncio.sleep(0)
+        await agent.log_decision(decision_type="test", action_taken="second", reasoning="r", confidence=0.9)
+        await agent.flush_decisions()
+        
+        written = [
+            decision.action_taken
+            for call in memory_store.store_agent_decisions_batch.await_args_list
+            for decision in call.args[0]
+        ]
+        assert written == ["first", "second"]
 
 
 @pytest.mark.asyncio 
@@ -196,6 +454,162 @@ class TestRegulationMonitor:
         assert agent.agent_type == "regulation_monitor"
         assert "EPA" in agent.system_prompt
         assert agent.agent_id is not None
+    
+    async def test_run_survives_failed_analysis(self):
+        """Test documents are analyzed in one batch and a failed retry drops only its document."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.log_decision = AsyncMock()
+        agent.think_structured = AsyncMock(side_effect=[
+            {"analyses": [{"index": 2, "is_relevant": True, "is_new": True, "summary": "NESHAP amendments"}]},
+            RuntimeError("LLM unavailable"),
+        ])
+        
+        results = await agent.run(lookback_days=30)
+        
+        assert agent.think_structured.await_count == 2
+        assert [reg["id"] for reg in results["new_regulations"]] == ["2024-12346"]
+        assert len(results["upcoming_deadlines"]) == 2
+    
+    async def test_analysis_cached_by_document_number(self):
+        """Test repeat scans reuse analyses unless a refresh is forced."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.llm = MagicMock(temperature=0.1)
+        agent.think_structured = AsyncMock(return_value={"is_relevant": False})
+        document = {"document_number": "2024-12345", "title": "NSPS OOOOb"}
+        
+        await agent._analyze_regulation(document)
+        await agent._analyze_regulation(dict(document))
+        assert agent.think_structured.await_count == 1
+        
+        await agent._analyze_regulation(document, force_refresh=True)
+        assert agent.think_structured.await_count == 2
+    
+    async def test_run_skips_seen_documents(self):
+        """Test later scans can skip processed documents unless asked to reprocess."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.log_decision = AsyncMock()
+        agent._analyze_regulations_batch = AsyncMock(
+            side_effect=lambda docs, force_refresh=False: [{"is_relevant": True} for _ in docs]
+        )
+        
+        first = await agent.run(lookback_days=30)
+        second = await agent.run(lookback_days=30, skip_seen=True)
+        third = await agent.run(lookback_days=30, skip_seen=True, reprocess_ids={"2024-12346"})
+        
+        assert len(first["amended_regulations"]) == 2
+        assert second["amended_regulations"] == []
+        assert [reg["id"] for reg in third["amended_regulations"]] == ["2024-12346"]
+    
+    async def test_unparsed_analysis_not_marked_seen(self):
+        """Test documents whose analysis failed to parse are retried."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        agent.log_decision = AsyncMock()
+        agent._analyze_regulations_batch = AsyncMock(
+            side_effect=lambda docs, force_refresh=False: [{"raw_response": "", "parse_error": "bad"} for _ in docs]
+        )
+        
+        await agent.run(lookback_days=30, skip_seen=True)
+        await agent.run(lookback_days=30, skip_seen=True)
+        
+        assert len(agent._analyze_regulations_batch.await_args_list[1].args[0]) == 2
+    
+    async def test_regulation_record_normalizes_types(self):
+        """Test LLM-reported facility and source types map to model enum values."""
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        agent = RegulationMonitorAgent()
+        record = agent._create_regulation_record(
+            {"document_number": "2024-12345", "type": "Rule", "cfr_references": [{"title": 40, "part": 60}]},
+            {
+                "applicable_facility_types": ["Production", " gathering", "wellsite"],
+                "applicable_emission_sources": "fugitive",
+            },
+        )
+        
+        assert record["regulation_type"] == "nsps"
+        assert record["applicable_facility_types"] == ["production", "gathering"]
+        assert record["applicable_emission_sources"] == []
+    
+    async def test_live_fetch_pages_federal_register(self):
+        """Test live fetching reads every API page over the pooled client."""
+        import httpx
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        def handler(request):
+            page = int(request.url.params["page"])
+            assert request.url.params["conditions[publication_date][gte]"] == "2024-01-01"
+            return httpx.Response(200, json={
+                "total_pages": 3,
+                "results": [{"document_number": f"2024-{page}"}],
+            })
+        
+        agent = RegulationMonitorAgent()
+        agent._http = httpx.AsyncClient(
+            base_url=settings.epa.federal_register_base_url,
+            transport=httpx.MockTransport(handler),
+        )
+        
+        with patch.object(settings.epa, "live_federal_register", True):
+            documents = await agent._fetch_federal_register(date(2024, 1, 1))
+        await agent.aclose()
+        
+        assert [doc["document_number"] for doc in documents] == ["2024-1", "2024-2", "2024-3"]
+        assert agent._http is None
+    
+    async def test_full_text_streamed_up_to_limit(self):
+        """Test full text keeps headings and paragraphs and stops at the limit."""
+        import httpx
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        xml = (
+            "<RULE><PREAMB><AGENCY>EPA</AGENCY><SUM><HD>SUMMARY:</HD>"
+            "<P>Final  amendments to\n NSPS OOOOb.</P></SUM></PREAMB>"
+            + "<SUPLINF>" + "<P>Background paragraph.</P>" * 5000 + "</SUPLINF></RULE>"
+        )
+        agent = RegulationMonitorAgent()
+        agent._http = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, text=xml)),
+        )
+        
+        text = await agent.fetch_full_text(
+            {"full_text_xml_url": "https://example.test/full.xml"}, max_chars=60
+        )
+        await agent.aclose()
+        
+        assert text.startswith("SUMMARY:\nFinal amendments to NSPS OOOOb.\nBackground")
+        assert len(text) == 60
+
+    async def test_missing_abstract_filled_from_full_text(self):
+        """Test live documents without an abstract are analyzed from their full text."""
+        import httpx
+        from agents.regulation_monitor import RegulationMonitorAgent
+        
+        xml = "<RULE><SUM><HD>SUMMARY:</HD><P>Amendments to NSPS OOOOb.</P></SUM></RULE>"
+        agent = RegulationMonitorAgent()
+        agent._http = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, text=xml)),
+        )
+        agent.think_structured = AsyncMock(return_value={"is_relevant": False})
+        documents = [
+            {"document_number": "2024-1", "abstract": None, "full_text_xml_url": "https://example.test/1.xml"},
+            {"document_number": "2024-2", "abstract": "Given abstract."},
+        ]
+        
+        with patch.object(settings.epa, "live_federal_register", True):
+            await agent._analyze_regulations_batch(documents, force_refresh=True)
+        await agent.aclose()
+        
+        batch_prompt = agent.think_structured.await_args_list[0].kwargs["prompt"]
+        assert "SUMMARY:\nAmendments to NSPS OOOOb." in batch_prompt
+        assert documents[1]["abstract"] == "Given abstract."
 
 
 @pytest.mark.asyncio
@@ -210,6 +624,159 @@ class TestImpactAssessor:
         
         assert agent.agent_type == "impact_assessor"
         assert agent.agent_id is not None
+    
+    async def test_resolve_regulations_defaults_to_applicable(self):
+        """Test the public entry points used by the crew."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        given = [{"id": "reg-1"}]
+        
+        assert await agent.resolve_regulations(given) is given
+        assert await agent.resolve_regulations() == await agent._get_applicable_regulations()
+        
+        facilities = [{"facility_type": "production"}, {"facility_type": "processing"}]
+        assert agent.classify_facilities(facilities) == agent._classify_facilities_batch(facilities)
+    
+    async def test_regulation_index_sees_appended_regulations(self):
+        """Test regulations appended to a reused list become candidates."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        regulations = [{"id": "reg-1", "applicable_facility_types": ["production"]}]
+        agent._get_regulation_index(regulations)
+        
+        regulations.append({"id": "reg-2", "applicable_facility_types": ["production"]})
+        by_type, _ = agent._get_regulation_index(regulations)
+        
+        assert by_type["production"] == [0, 1]
+    
+    async def test_applicability_rules_skip_llm(self):
+        """Test rule-decided regulations do not call the LLM."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="YES"))
+        facility = {
+            "facility_type": "gathering",
+            "metadata": {
+                "emission_sources": [{"source_type": "fugitive", "installation_date": "2019-03-01"}],
+                "total_potential_emissions_tpy": {"CO2e": 12000},
+            },
+        }
+        
+        assert await agent._check_detailed_applicability(facility, {"id": "nsps-ooooa"}) is True
+        assert await agent._check_detailed_applicability(facility, {"id": "ghg-subpart-w"}) is False
+        agent.llm.ainvoke.assert_not_awaited()
+        
+        assert await agent._check_detailed_applicability(facility, {"id": "state-rule"}) is True
+        agent.llm.ainvoke.assert_awaited_once()
+    
+    async def test_applicability_rules_defer_without_dates(self):
+        """Test OOOOa and HH defer to the LLM when the profile can't decide."""
+        from agents.impact_assessor import _nsps_ooooa_applies, _neshap_hh_applies
+        
+        facility = {
+            "facility_type": "production",
+            "metadata": {
+                "emission_sources": [{"source_type": "storage", "installation_date": date(2012, 5, 1)}],
+                "total_potential_emissions_tpy": {"HAP": 2},
+            },
+        }
+        
+        assert _nsps_ooooa_applies(facility) is None
+        assert _neshap_hh_applies(facility) is None
+        assert _neshap_hh_applies({"metadata": {"total_potential_emissions_tpy": {"HAP": None}}}) is None
+    
+    async def test_no_emissions_skips_emissions_regulations(self):
+        """Test facilities with no sources or PTE skip emissions-based rules."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="YES"))
+        facility = {
+            "facility_type": "production",
+            "metadata": {"emission_sources": [], "total_potential_emissions_tpy": {"VOC": 0}},
+        }
+        regulations = [
+            {"id": "nsps-ooooa", "regulation_type": "nsps"},
+            {"id": "state-permit", "regulation_type": "state"},
+        ]
+        
+        applicable = await agent._determine_applicability(facility, regulations)
+        
+        assert [reg["id"] for reg in applicable] == ["state-permit"]
+        agent.llm.ainvoke.assert_awaited_once()
+    
+    async def test_reduce_assessment_totals(self):
+        """Test impact aggregation scores, totals and orders actions."""
+        from agents.impact_assessor import _reduce_assessment
+        
+        impacts = [
+            {
+                "impact_level": "low",
+                "impact_score": 20,
+                "estimated_cost": 1000,
+                "required_actions": [{"priority": "medium", "description": "Update records"}],
+            },
+            {
+                "impact_level": "critical",
+                "impact_score": 90,
+                "estimated_cost": 5000,
+                "required_actions": [{"priority": "critical", "description": "Install controls"}],
+            },
+        ]
+        
+        totals = _reduce_assessment(impacts)
+        
+        assert totals["overall_impact_score"] == 78.3
+        assert totals["estimated_total_cost"] == 6000
+        assert [a["description"] for a in totals["required_actions"]] == ["Install controls", "Update records"]
+        assert totals["top_issues"][0]["impact_level"] == "critical"
+    
+    async def test_regulation_impact_cached(self):
+        """Test unchanged facility/regulation pairs reuse the cached impact."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        agent.llm = MagicMock(temperature=0.1)
+        agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content='{"impact_score": 80}'))
+        facility = {"facility_id": "fac-1", "name": "Test Facility"}
+        regulation = {"id": "nsps-ooooa", "citation": "40 CFR 60 Subpart OOOOa"}
+        
+        first = await agent._assess_regulation_impact(facility, regulation)
+        agent._llm_cache.clear()
+        second = await agent._assess_regulation_impact(facility, regulation)
+        
+        assert first == second == {"impact_score": 80, "regulation_citation": "40 CFR 60 Subpart OOOOa"}
+        assert first is not second
+        agent.llm.ainvoke.assert_awaited_once()
+    
+    async def test_regulation_impacts_batched(self):
+        """Test regulations share one call, with misses assessed individually."""
+        from agents.impact_assessor import ImpactAssessorAgent
+        
+        agent = ImpactAssessorAgent()
+        agent.llm = MagicMock(temperature=0)
+        agent.llm.ainvoke = AsyncMock(side_effect=[
+            MagicMock(content='{"impacts": [{"index": 2, "impact_score": 40}]}'),
+            MagicMock(content='{"impact_score": 90}'),
+        ])
+        facility = {"facility_id": "fac-1", "name": "Test Facility"}
+        regulations = [
+            {"id": "nsps-ooooa", "citation": "40 CFR 60 Subpart OOOOa"},
+            {"id": "neshap-hh", "citation": "40 CFR 63 Subpart HH"},
+        ]
+        
+        impacts = await agent._assess_regulations_batch(facility, regulations)
+        
+        assert [(i["regulation_citation"], i["impact_score"]) for i in impacts] == [
+            ("40 CFR 60 Subpart OOOOa", 90),
+            ("40 CFR 63 Subpart HH", 40),
+        ]
+        assert agent.llm.ainvoke.await_count == 2
 
 
 @pytest.mark.asyncio
@@ -226,6 +793,243 @@ class TestReportGenerator:
         assert agent.agent_id is not None
 
 
+class TestReasoning:
+    """Test chain-of-thought reasoning."""
+    
+    def test_regulation_relevance_keywords(self):
+        """Test keyword and CFR scoring for regulation relevance."""
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        reasoner = ChainOfThoughtReasoner("regulation_monitor")
+        regulation = {
+            "id": "reg-1",
+            "title": "Methane Standards for Natural Gas Compressor Stations",
+            "description": "Fugitive emissions monitoring",
+            "citation": "40 CFR 60 Subpart OOOOb",
+        }
+        
+        is_relevant, score, chain = reasoner.reason_about_regulation_relevance(regulation)
+        
+        assert is_relevant
+        assert score == pytest.approx(0.92)
+        assert chain.steps[1].evidence == [
+            "Found keywords: gas, natural gas, compressor, fugitive emissions, methane"
+        ]
+        assert chain.steps[2].evidence == [
+            "40 CFR 60 (NSPS) - includes O&G subparts OOOO, OOOOa, OOOOb"
+        ]
+    
+    def test_relevance_without_explanation_is_cached(self):
+        """Test unexplained relevance checks skip chains and reuse scores."""
+        from agents.reasoning import ChainOfThoughtReasoner, _score_regulation
+        
+        ChainOfThoughtReasoner.clear_cache()
+        reasoner = ChainOfThoughtReasoner("regulation_monitor")
+        regulation = {"title": "Gas Well Completions", "description": "Methane", "citation": "40 CFR 60"}
+        
+        first = reasoner.reason_about_regulation_relevance(regulation, explain=False)
+        second = reasoner.reason_about_regulation_relevance(dict(regulation), explain=False)
+        
+        assert first == second
+        assert first[2] is None
+        assert reasoner.chains == []
+        assert _score_regulation.cache_info().hits == 1
+    
+    def test_batch_relevance_matches_single(self):
+        """Test batch relevance scoring agrees with per-regulation reasoning."""
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        reasoner = ChainOfThoughtReasoner("regulation_monitor")
+        regulations = [
+            {"title": "Crude Oil Storage Tank Controls", "description": "VOC limits", "citation": "40 CFR 63 Subpart HH"},
+            {"title": "Lead Paint Renovation", "description": "", "citation": "40 CFR 745"},
+            {"title": "Methane Rule", "description": "", "citation": "40 CFR 98 Subpart W; 40 CFR 60 OOOOb"},
+        ]
+        
+        scores = ChainOfThoughtReasoner.score_regulations_batch(regulations)
+        
+        for regulation, (_, row) in zip(regulations, scores.iterrows()):
+            is_relevant, score, _ = reasoner.reason_about_regulation_relevance(regulation)
+            assert row["is_relevant"] == is_relevant
+            assert row["combined_score"] == pytest.approx(score)
+        
+        # Multi-part citations score as their highest-precedence part (NSPS)
+        assert scores["cfr_relevance"].tolist()[2] == 0.8
+    
+    def test_catalog_scoring_splits_into_slabs(self):
+        """Test catalog scoring across worker processes matches batch scoring."""
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        regulations = [
+            {"title": f"Natural Gas Compressor Rule {i}", "description": "methane", "citation": "40 CFR 60"}
+            if i % 2 else
+            {"title": f"Lead Paint Rule {i}", "description": "", "citation": "40 CFR 745"}
+            for i in range(9)
+        ]
+        
+        with patch("agents.reasoning._CATALOG_SLAB_MIN_ROWS", 3):
+            scores = ChainOfThoughtReasoner.score_catalog(regulations, workers=2)
+        
+        expected = ChainOfThoughtReasoner.score_regulations_batch(regulations)
+        assert scores["combined_score"].tolist() == pytest.approx(expected["combined_score"].tolist())
+        assert scores["is_relevant"].tolist() == expected["is_relevant"].tolist()
+
+    
+    def test_chain_steps_materialized_on_access(self):
+        """Test column-stored steps read back as ReasoningStep objects."""
+        from agents.reasoning import ReasoningChain, ReasoningStep, ReasoningType
+        
+        chain = ReasoningChain(task_id="t-1", agent_type="gap_analyzer", question="Q?")
+        chain.add_step(ReasoningType.OBSERVATION, "Observed", confidence=1.0, evidence=["a"])
+        chain.add_step(ReasoningType.INFERENCE, "Inferred", confidence=0.7)
+        
+        steps = chain.steps
+        
+        assert len(steps) == 2
+        assert isinstance(steps[-1], ReasoningStep)
+        assert (steps[1].step_number, steps[1].content, steps[1].confidence) == (2, "Inferred", 0.7)
+        assert [step.to_dict() for step in steps] == chain.to_dict()["steps"]
+    
+    def test_known_evidence_shared_across_chains(self):
+        """Test fixed evidence strings are stored as one shared instance."""
+        from agents.reasoning import ReasoningChain, ReasoningType
+        
+        evidence = [
+            "".join(["Facility factor: ", "high"]),
+            "".join(["Gap type: ", "ldar"]),
+        ]
+        chains = [ReasoningChain(task_id=f"t-{i}", agent_type="gap_analyzer", question="Q?") for i in range(2)]
+        steps = [
+            chain.add_step(ReasoningType.INFERENCE, "Inferred", confidence=0.7, evidence=list(evidence))
+            for chain in chains
+        ]
+        
+        assert steps[0].evidence[0] is steps[1].evidence[0]
+        assert steps[0].evidence[1] is evidence[1]
+        assert steps[0].evidence == evidence
+    
+    def test_calibration_buckets(self):
+        """Test calibration statistics per confidence bucket."""
+        from agents.reasoning import ConfidenceCalibrator
+        
+        calibrator = ConfidenceCalibrator()
+        for i, (confidence, predicted, actual) in enumerate([
+            (0.9, "HIGH", "HIGH"),
+            (0.9, "HIGH", "LOW"),
+            (0.6, "MEDIUM", "MEDIUM"),
+            (0.3, "LOW", "HIGH"),
+        ]):
+            calibrator.record_prediction(f"p-{i}", predicted, confidence, "severity")
+            calibrator.record_outcome(f"p-{i}", actual)
+        
+        results = calibrator.calculate_calibration()
+        
+        assert results["samples"] == 4
+        assert results["high_accuracy"] == 0.5
+        assert results["medium_calibration"] == pytest.approx(1 / 0.6)
+        assert results["low_accuracy"] == 0.0
+        assert results["accuracy"] == 0.5
+        assert calibrator.calibration_factor == pytest.approx(0.5 / 0.675)
+    
+    def test_calibration_outcome_corrected(self):
+        """Test a corrected outcome replaces, not adds to, the first one."""
+        from agents.reasoning import ConfidenceCalibrator
+        
+        calibrator = ConfidenceCalibrator()
+        calibrator.record_prediction("p-1", "HIGH", 0.9, "severity")
+        calibrator.record_outcome("p-1", "LOW")
+        calibrator.record_outcome("p-1", "HIGH")
+        
+        results = calibrator.calculate_calibration()
+        
+        assert results["samples"] == 1
+        assert results["accuracy"] == 1.0
+    
+    def test_calibration_evicts_oldest_predictions(self):
+        """Test evicted predictions drop out of calibration and lookups."""
+        from agents.reasoning import ConfidenceCalibrator
+        
+        calibrator = ConfidenceCalibrator(max_predictions=2)
+        for i, actual in enumerate(["LOW", "HIGH", "HIGH"]):
+            calibrator.record_prediction(f"p-{i}", "HIGH", 0.9, "severity")
+            calibrator.record_outcome(f"p-{i}", actual)
+        calibrator.record_outcome("p-0", "HIGH")
+        
+        results = calibrator.calculate_calibration()
+        
+        assert len(calibrator.predictions) == 2
+        assert results["samples"] == 2
+        assert results["accuracy"] == 1.0
+    
+    def test_chain_confidences_feed_calibrator(self):
+        """Test chain confidences export as an array and chains calibrate."""
+        from agents.reasoning import ChainOfThoughtReasoner, ConfidenceCalibrator
+        
+        reasoner = ChainOfThoughtReasoner("gap_analyzer")
+        severity, confidence, chain = reasoner.reason_about_gap_severity(
+            {"id": "gap-1", "title": "Methane leak", "regulation_id": "nsps-ooooa"},
+            {"name": "Test Facility"},
+        )
+        
+        confidences = chain.confidences_np()
+        chain.add_step(chain.steps[0].step_type, "Follow-up", confidence=0.5)
+        
+        assert confidences.tolist() == [step.confidence for step in chain.steps][:-1]
+        
+        calibrator = ConfidenceCalibrator()
+        calibrator.record_chain(chain, "severity")
+        calibrator.record_outcome(chain.task_id, severity.upper())
+        
+        assert calibrator.calculate_calibration()["accuracy"] == 1.0
+    
+    def test_remediation_cost_quantity(self):
+        """Test remediation cost scales with the unit count in the description."""
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        reasoner = ChainOfThoughtReasoner("gap_analyzer")
+        gap = {"title": "Pneumatic controller replacement", "description": "Replace 15 Controllers at site"}
+        
+        cost, confidence, _ = reasoner.reason_about_remediation_cost(gap)
+        
+        assert cost == 1250 * 15
+        assert confidence == pytest.approx(0.75)
+    
+    def test_export_chains_json(self):
+        """Test chains export as JSON matching their dictionaries."""
+        import orjson
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        reasoner = ChainOfThoughtReasoner("gap_analyzer")
+        reasoner.reason_about_remediation_cost({"id": "gap-1", "title": "LDAR survey overdue"})
+        
+        exported = orjson.loads(reasoner.export_chains_json())
+        
+        assert exported == reasoner.export_chains()
+        assert orjson.loads(reasoner.chains[0].to_json_bytes()) == exported[0]
+    
+    def test_gap_severity_deadline_buckets(self):
+        """Test deadline proximity drives the deadline severity step."""
+        from datetime import timedelta
+        from agents.reasoning import ChainOfThoughtReasoner
+        
+        reasoner = ChainOfThoughtReasoner("gap_analyzer")
+        facility = {"name": "Test Facility", "is_major_source": True}
+        
+        results = {}
+        for days in (-10, 10, 60, 120, 400):
+            deadline = (datetime.utcnow() + timedelta(days=days, hours=12)).isoformat()
+            gap = {"title": "Methane leak", "regulation_id": "nsps-ooooa", "regulatory_deadline": deadline}
+            severity, _, chain = reasoner.reason_about_gap_severity(gap, facility)
+            results[days] = (chain.steps[1].content, severity)
+        
+        assert results == {
+            -10: ("Deadline analysis: CRITICAL urgency", "high"),
+            10: ("Deadline analysis: CRITICAL urgency", "high"),
+            60: ("Deadline analysis: HIGH urgency", "high"),
+            120: ("Deadline analysis: MEDIUM urgency", "high"),
+            400: ("Deadline analysis: LOW urgency", "medium"),
+        }
+
 class TestAPISchemas:
     """Test API schemas."""
     